@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# ----------------------------------------------------------------------------
+#
+# ****************************************************************************
+# (c) Copyright by brainelectronics/ElectronicFuture, ALL RIGHTS RESERVED
+# ****************************************************************************
+#
+#  @author       brainelectronics (info@brainelectronics.de)
+#  @file         connectionSupervisor.py
+#  @date         October, 2026
+#  @version      0.1.0
+#  @brief        Detect lost serial connections and reconnect automatically
+#
+#   used by serialDebugMonitor.py
+#
+#   All I/O of the reading thread goes through the supervisor. An I/O error
+#   or a vanished port marks the connection as lost, afterwards reconnect()
+#   polls for the port with a bounded exponential backoff and reopens the
+#   very same serial.Serial object, so all its settings are kept.
+# ----------------------------------------------------------------------------
+
+import collections
+import logging
+import os
+import time
+
+import serial.tools.list_ports as port_list
+from serial import SerialException
+
+
+class ConnectionSupervisor(object):
+    ##
+    ## @brief      Create a new supervisor of a serial connection
+    ##
+    ## @param      self           The object
+    ## @param      connection     The serial.Serial object to supervise
+    ## @param      onLost         Called with the exception if connection is lost
+    ## @param      onRestored     Called with outage and resume time (seconds)
+    ## @param      minBackoff     First wait between two reconnect attempts
+    ## @param      maxBackoff     Upper bound of wait between two attempts
+    ## @param      probeInterval  Check port presence if idle for this long
+    ##
+    def __init__(self,
+                 connection,
+                 onLost=None,
+                 onRestored=None,
+                 minBackoff=0.001,
+                 maxBackoff=0.05,
+                 probeInterval=0.5):
+        self.logger = logging.getLogger(__name__)
+
+        self.connection = connection
+        self.onLost = onLost
+        self.onRestored = onRestored
+        self.minBackoff = minBackoff
+        self.maxBackoff = maxBackoff
+        self.probeInterval = probeInterval
+
+        self.reconnectCount = 0
+        # outage duration and time from port reappearance to reopened port
+        self.outageDurations = collections.deque(maxlen=100)
+        self.resumeLatencies = collections.deque(maxlen=100)
+
+        self._connected = connection.isOpen()
+        self._lostAt = None
+        self._lastActivity = time.time()
+
+    ##
+    ## @brief      Check if the connection is usable
+    ##
+    ## @param      self  The object
+    ##
+    ## @retval     True     Connection is open
+    ## @retval     False    Connection is lost, call reconnect()
+    ##
+    def isConnected(self):
+        return self._connected
+
+    ##
+    ## @brief      Check if the device of the port exists
+    ##
+    ## Device nodes are checked on the file system, other ports like COM3 by
+    ## enumerating all ports which is much slower
+    ##
+    ## @param      self  The object
+    ##
+    ## @retval     True     Port is present
+    ## @retval     False    Port is not present
+    ##
+    def isPortPresent(self):
+        port = self.connection.port
+        if port is None:
+            return False
+
+        if os.path.isabs(port):
+            return os.path.exists(port)
+
+        return any(p.device == port for p in port_list.comports())
+
+    ##
+    ## @brief      Get number of bytes waiting in the input buffer
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     Number of waiting bytes, 0 if the connection is lost
+    ##
+    def inWaiting(self):
+        if not self._connected:
+            return 0
+
+        try:
+            waiting = self.connection.inWaiting()
+        except (SerialException, OSError) as e:
+            self._markLost(e)
+            return 0
+
+        now = time.time()
+        if waiting > 0:
+            self._lastActivity = now
+        elif now - self._lastActivity > self.probeInterval:
+            # some drivers report nothing while the device is gone
+            self._lastActivity = now
+            if not self.isPortPresent():
+                self._markLost(SerialException("Port %s disappeared" %(self.connection.port)))
+
+        return waiting
+
+    ##
+    ## @brief      Read a '\n' terminated line
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     The line, empty bytes if the connection is lost
+    ##
+    def readline(self):
+        return self._call(self.connection.readline, b"")
+
+    ##
+    ## @brief      Read up to size bytes
+    ##
+    ## @param      self  The object
+    ## @param      size  The number of bytes to read
+    ##
+    ## @return     The data, empty bytes if the connection is lost
+    ##
+    def read(self, size=1):
+        return self._call(self.connection.read, b"", size)
+
+    ##
+    ## @brief      Reopen the lost connection
+    ##
+    ## Blocks until the port is opened again or isRunning returns False.
+    ##
+    ## @param      self       The object
+    ## @param      isRunning  Callable returning False to give up
+    ##
+    ## @retval     True     Connection is restored
+    ## @retval     False    Stopped by isRunning before reconnecting
+    ##
+    def reconnect(self, isRunning):
+        if self._connected:
+            return True
+
+        backoff = self.minBackoff
+        presentSince = None
+
+        while isRunning():
+            if self.isPortPresent():
+                if presentSince is None:
+                    presentSince = time.time()
+
+                try:
+                    self.connection.open()
+                except (SerialException, OSError) as e:
+                    # device node may exist before it is accessible
+                    self.logger.debug("Reopening %s failed: %s" %(self.connection.port, e))
+                else:
+                    self._markRestored(presentSince)
+                    return True
+            else:
+                presentSince = None
+
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.maxBackoff)
+
+        return False
+
+    ##
+    ## @brief      Gets the reconnect statistics.
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     Dict of reconnect count and last/max durations in seconds
+    ##
+    def getStatistics(self):
+        stats = dict()
+        stats["reconnects"] = self.reconnectCount
+        stats["lastOutage"] = self.outageDurations[-1] if self.outageDurations else None
+        stats["lastResume"] = self.resumeLatencies[-1] if self.resumeLatencies else None
+        stats["maxResume"] = max(self.resumeLatencies) if self.resumeLatencies else None
+
+        return stats
+
+    def _call(self, function, default, *args):
+        if not self._connected:
+            return default
+
+        try:
+            return function(*args)
+        except (SerialException, OSError) as e:
+            self._markLost(e)
+            return default
+
+    def _markLost(self, error):
+        self._connected = False
+        self._lostAt = time.time()
+
+        # release the handle of the vanished device
+        try:
+            self.connection.close()
+        except (SerialException, OSError):
+            pass
+
+        self.logger.warning("Connection to %s lost: %s" %(self.connection.port, error))
+
+        if self.onLost is not None:
+            self.onLost(error)
+
+    def _markRestored(self, presentSince):
+        now = time.time()
+        outage = now - self._lostAt
+        resume = now - presentSince
+
+        self._connected = True
+        self._lastActivity = now
+        self.reconnectCount += 1
+        self.outageDurations.append(outage)
+        self.resumeLatencies.append(resume)
+
+        self.logger.info("Reconnected to %s after %.3fs, %.1fms after port reappeared"
+                         %(self.connection.port, outage, resume * 1000))
+
+        if self.onRestored is not None:
+            self.onRestored(outage, resume)
+
+# end of class ConnectionSupervisor
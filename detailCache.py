@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# ----------------------------------------------------------------------------
+#
+# ****************************************************************************
+# (c) Copyright by brainelectronics/ElectronicFuture, ALL RIGHTS RESERVED
+# ****************************************************************************
+#
+#  @author       brainelectronics (info@brainelectronics.de)
+#  @file         detailCache.py
+#  @date         October, 2026
+#  @version      0.1.0
+#  @brief        Versioned cache of the rows of the detail list
+#
+#   used by serialDebugMonitor.py
+#
+#   The detail list shows the flattened subtree of the selected top level
+#   key. The cache remembers the subtree last shown. The snapshot history
+#   shares unchanged subtrees between snapshots, so if the new subtree is
+#   the very same object, nothing has to be flattened or repainted.
+#   Otherwise only rows whose value text differs have to be updated, as
+#   long as the keys are unchanged. Cached subtrees must not be modified.
+# ----------------------------------------------------------------------------
+
+from flatJson import flatten_json
+
+# results of DetailRowCache.update()
+CACHE_HIT = "hit"
+CACHE_PARTIAL = "partial"
+CACHE_FULL = "full"
+
+
+class DetailRowCache(object):
+    ##
+    ## @brief      Create a new detail row cache
+    ##
+    ## @param      self     The object
+    ## @param      flatten  Function to flatten a nested dict
+    ##
+    def __init__(self, flatten=flatten_json):
+        self.flatten = flatten
+
+        self.hits = 0
+        self.partialUpdates = 0
+        self.fullUpdates = 0
+
+        # increased on every change of the cached content
+        self.version = 0
+
+        self._key = None
+        self._value = None
+        self._rows = list()
+
+    ##
+    ## @brief      Gets the rows currently shown
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     List of (key, value text) tuples
+    ##
+    def getRows(self):
+        return self._rows
+
+    ##
+    ## @brief      Forget the cached content, next update repaints all rows
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     None
+    ##
+    def invalidate(self):
+        self._key = None
+        self._value = None
+        self._rows = list()
+
+    ##
+    ## @brief      Update the cache with the current content of a key
+    ##
+    ## @param      self   The object
+    ## @param      key    The top level key
+    ## @param      value  The (nested) value of this key
+    ##
+    ## @return     Tuple of CACHE_HIT, CACHE_PARTIAL or CACHE_FULL and the
+    ##             list of changed row indices for CACHE_PARTIAL
+    ##
+    def update(self, key, value):
+        # unchanged subtrees are shared, an identity check is enough
+        if key == self._key and value is self._value:
+            self.hits += 1
+            return CACHE_HIT, None
+
+        if type(value) is dict:
+            rows = [(el, str(val)) for el, val in sorted(self.flatten(value).items())]
+        else:
+            rows = [(key, str(value))]
+
+        oldRows = self._rows
+        sameKey = key == self._key
+
+        self._key = key
+        self._value = value
+        self._rows = rows
+        self.version += 1
+
+        if sameKey and len(rows) == len(oldRows) and all(a[0] == b[0] for a, b in zip(rows, oldRows)):
+            self.partialUpdates += 1
+            changed = [idx for idx, (new, old) in enumerate(zip(rows, oldRows)) if new[1] != old[1]]
+            return CACHE_PARTIAL, changed
+
+        self.fullUpdates += 1
+        return CACHE_FULL, None
+
+    ##
+    ## @brief      Gets the hit and miss statistics.
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     Dict of hits, misses and the kind of the misses
+    ##
+    def getStatistics(self):
+        stats = dict()
+        stats["hits"] = self.hits
+        stats["misses"] = self.partialUpdates + self.fullUpdates
+        stats["partialUpdates"] = self.partialUpdates
+        stats["fullUpdates"] = self.fullUpdates
+        stats["version"] = self.version
+
+        return stats
+
+# end of class DetailRowCache
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# ----------------------------------------------------------------------------
+#
+# ****************************************************************************
+# (c) Copyright by brainelectronics/ElectronicFuture, ALL RIGHTS RESERVED
+# ****************************************************************************
+#
+#  @author       brainelectronics (info@brainelectronics.de)
+#  @file         flatJson.py
+#  @date         October, 2026
+#  @version      0.1.0
+#  @brief        Flatten nested JSON structures
+#
+#   used by serialDebugMonitor.py and all modules working on flattened keys
+#
+#   Keys of nested dicts and list indices are joined by '_', e.g.
+#   {"evse": {"current": [16, 32]}} becomes
+#   {"evse_current_0": 16, "evse_current_1": 32}
+# ----------------------------------------------------------------------------
+
+
+##
+## @brief      Convert nested dict to flat dict
+##
+## @param      y     Dict to flatten
+##
+## @return     Flat JSON structure
+##
+def flatten_json(y):
+    out = {}
+
+    def flatten(x, name=''):
+        if type(x) is dict:
+            for a in x:
+                flatten(x[a], name + a + '_')
+        elif type(x) is list:
+            i = 0
+            for a in x:
+                flatten(a, name + str(i) + '_')
+                i += 1
+        else:
+            out[name[:-1]] = x
+
+    flatten(y)
+
+    return out
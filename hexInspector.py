@@ -0,0 +1,436 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# ----------------------------------------------------------------------------
+#
+# ****************************************************************************
+# (c) Copyright by brainelectronics/ElectronicFuture, ALL RIGHTS RESERVED
+# ****************************************************************************
+#
+#  @author       brainelectronics (info@brainelectronics.de)
+#  @file         hexInspector.py
+#  @date         October, 2026
+#  @version      0.1.0
+#  @brief        Hex and ASCII view of raw binary serial data
+#
+#   used by serialDebugMonitor.py
+#
+#   Raw data is kept in preallocated chunks whose size is a multiple of the
+#   row width, so every row is a memoryview slice of a single chunk. The
+#   view is a virtual list, only rows being painted are formatted.
+# ----------------------------------------------------------------------------
+
+import re
+import threading
+
+import wx
+
+# bytes per row of the hex view
+ROW_BYTES = 16
+
+# printable ASCII is shown as is, everything else as '.'
+ASCII_TABLE = bytes(c if 0x20 <= c < 0x7f else ord(".") for c in range(256))
+
+# explicit hex patterns, "0xdeadbeef" or space separated pairs "de ad be ef"
+HEX_PREFIXED_PATTERN = re.compile(r"^0[xX]((?:[0-9a-fA-F]{2})+)$")
+HEX_PAIRS_PATTERN = re.compile(r"^[0-9a-fA-F]{2}(?:\s+[0-9a-fA-F]{2})+$")
+
+
+class ByteCapture(object):
+    ##
+    ## @brief      Create a new capture of raw bytes
+    ##
+    ## @param      self        The object
+    ## @param      chunkBytes  Size of a single chunk, multiple of ROW_BYTES
+    ## @param      maxChunks   Drop the oldest chunk above this, None to keep all
+    ##
+    def __init__(self, chunkBytes=1024*1024, maxChunks=None):
+        if chunkBytes % ROW_BYTES:
+            raise ValueError("chunkBytes must be a multiple of %d" %(ROW_BYTES))
+
+        self.chunkBytes = chunkBytes
+        self.maxChunks = maxChunks
+
+        self._chunks = list()
+        # offsets are absolute, counted since the capture was started or
+        # cleared. _base is the offset of the first kept chunk
+        self._base = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        # kept bytes only
+        return self._size - self._base
+
+    ##
+    ## @brief      Gets the offset of the first kept byte
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     The offset, bytes before it have been dropped
+    ##
+    def getBaseOffset(self):
+        return self._base
+
+    ##
+    ## @brief      Gets the offset after the last captured byte
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     The number of bytes captured since start or clear
+    ##
+    def getEndOffset(self):
+        return self._size
+
+    ##
+    ## @brief      Gets the number of kept rows
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     The row count, the last one may be incomplete
+    ##
+    def getRowCount(self):
+        return (len(self) + ROW_BYTES - 1) // ROW_BYTES
+
+    ##
+    ## @brief      Add received bytes to the capture
+    ##
+    ## @param      self  The object
+    ## @param      data  The received bytes
+    ##
+    ## @return     None
+    ##
+    def append(self, data):
+        view = memoryview(data)
+
+        with self._lock:
+            while len(view):
+                used = (self._size - self._base) % self.chunkBytes
+                if used == 0 and len(self._chunks) * self.chunkBytes == self._size - self._base:
+                    self._chunks.append(bytearray(self.chunkBytes))
+
+                    if self.maxChunks is not None and len(self._chunks) > self.maxChunks:
+                        self._chunks.pop(0)
+                        self._base += self.chunkBytes
+
+                count = min(self.chunkBytes - used, len(view))
+                self._chunks[-1][used:used + count] = view[:count]
+                view = view[count:]
+                self._size += count
+
+    ##
+    ## @brief      Remove all captured data
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     None
+    ##
+    def clear(self):
+        with self._lock:
+            self._chunks = list()
+            self._base = 0
+            self._size = 0
+
+    ##
+    ## @brief      Gets the data of a row without copying
+    ##
+    ## @param      self  The object
+    ## @param      row   The index of the row, 0 is the first kept row
+    ##
+    ## @return     The row as memoryview
+    ##
+    def getRow(self, row):
+        with self._lock:
+            offset = row * ROW_BYTES
+            chunk = self._chunks[offset // self.chunkBytes]
+            start = offset % self.chunkBytes
+            stop = min(start + ROW_BYTES, start + self._size - self._base - offset)
+
+            return memoryview(chunk)[start:stop]
+
+    ##
+    ## @brief      Format a row as offset, hex and ASCII text
+    ##
+    ## @param      self  The object
+    ## @param      row   The index of the row, 0 is the first kept row
+    ##
+    ## @return     Tuple of absolute offset, hex and ASCII text
+    ##
+    def formatRow(self, row):
+        data = self.getRow(row)
+
+        offsetText = "%08X" %(self._base + row * ROW_BYTES)
+        hexText = data.hex(" ")
+        asciiText = data.tobytes().translate(ASCII_TABLE).decode("ascii")
+
+        return offsetText, hexText, asciiText
+
+    ##
+    ## @brief      Find the next occurrence of a pattern
+    ##
+    ## @param      self     The object
+    ## @param      pattern  The bytes to search for
+    ## @param      start    The absolute offset to start the search at
+    ##
+    ## @return     The absolute offset of the match, -1 if not found
+    ##
+    def find(self, pattern, start=0):
+        if not pattern:
+            return -1
+
+        with self._lock:
+            base = self._base
+            size = self._size - base
+            chunks = list(self._chunks)
+        start = max(start - base, 0)
+        overlap = len(pattern) - 1
+
+        for chunkIndex in range(start // self.chunkBytes, len(chunks)):
+            chunkStart = chunkIndex * self.chunkBytes
+            used = min(self.chunkBytes, size - chunkStart)
+            if used <= 0:
+                break
+
+            position = chunks[chunkIndex].find(pattern, max(start - chunkStart, 0), used)
+            if position >= 0:
+                return base + chunkStart + position
+
+            # a match may span the border to the next chunk
+            if overlap and chunkIndex + 1 < len(chunks) and size > chunkStart + self.chunkBytes:
+                tailStart = max(self.chunkBytes - overlap, start - chunkStart, 0)
+                nextUsed = min(overlap, size - chunkStart - self.chunkBytes)
+                border = bytes(chunks[chunkIndex][tailStart:]) + bytes(chunks[chunkIndex + 1][:nextUsed])
+                position = border.find(pattern)
+                if position >= 0:
+                    return base + chunkStart + tailStart + position
+
+        return -1
+
+# end of class ByteCapture
+
+
+##
+## @brief      Parse the text of a search field
+##
+## Hex bytes are given as "0xdeadbeef" or as at least two space separated
+## pairs "de ad be ef", anything else is searched as text. So "cafe" or
+## "00" are text, use "0xcafe" or "0x00" for the bytes
+##
+## @param      text  The text of the search field
+##
+## @return     The pattern as bytes
+##
+def parsePattern(text):
+    stripped = text.strip()
+
+    match = HEX_PREFIXED_PATTERN.match(stripped)
+    if match is not None:
+        return bytes.fromhex(match.group(1))
+
+    if HEX_PAIRS_PATTERN.match(stripped):
+        return bytes.fromhex(stripped)
+
+    return text.encode("utf-8")
+
+
+##
+## @brief      Parse an offset as decimal or hex ("0x1F0") number
+##
+## @param      text  The text of the offset field
+##
+## @return     The offset, ValueError if invalid
+##
+def parseOffset(text):
+    text = text.strip()
+    if text.lower().startswith("0x"):
+        return int(text, 16)
+
+    return int(text)
+
+
+class HexListCtrl(wx.ListCtrl):
+    def __init__(self, parent, capture):
+        wx.ListCtrl.__init__(
+            self,
+            parent,
+            style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.BORDER_SUNKEN)
+
+        self.capture = capture
+
+        # OnGetItemText is called per column, format each row only once
+        self._lastRow = -1
+        self._lastText = None
+        self._lastSize = 0
+        self._lastBase = 0
+
+        self.SetFont(wx.Font(wx.FontInfo(10).Family(wx.FONTFAMILY_TELETYPE)))
+        self.InsertColumn(col=0, heading="Offset", width=90)
+        self.InsertColumn(col=1, heading="Hex", width=400)
+        self.InsertColumn(col=2, heading="ASCII", width=150)
+
+    ##
+    ## @brief      Update the number of rows after new data is captured
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     None
+    ##
+    def refresh(self):
+        size = self.capture.getEndOffset()
+        base = self.capture.getBaseOffset()
+        if size == self._lastSize and base == self._lastBase:
+            return
+
+        # the previously last row may have been incomplete, all rows move
+        # if the oldest data has been dropped
+        if size > self._lastSize and base == self._lastBase:
+            firstChanged = (self._lastSize - base) // ROW_BYTES
+        else:
+            firstChanged = 0
+        self._lastSize = size
+        self._lastBase = base
+        self._lastRow = -1
+
+        rowCount = self.capture.getRowCount()
+        if rowCount != self.GetItemCount():
+            self.SetItemCount(rowCount)
+        if firstChanged < rowCount:
+            self.RefreshItems(firstChanged, rowCount - 1)
+
+    def OnGetItemText(self, item, col):
+        if item != self._lastRow:
+            self._lastText = self.capture.formatRow(item)
+            self._lastRow = item
+
+        return self._lastText[col]
+
+# end of class HexListCtrl
+
+
+class frmHexInspector(wx.Frame):
+    def __init__(self, parent, capture, onClose=None):
+        wx.Frame.__init__(self, parent, wx.ID_ANY, "Hex Inspector", size=(720, 500))
+
+        self.capture = capture
+        self.onClose = onClose
+
+        self.lstHex = HexListCtrl(self, capture)
+        self.txtOffset = wx.TextCtrl(self, wx.ID_ANY, "", style=wx.TE_PROCESS_ENTER)
+        self.btnJump = wx.Button(self, wx.ID_ANY, "Jump")
+        self.txtPattern = wx.TextCtrl(self, wx.ID_ANY, "", style=wx.TE_PROCESS_ENTER)
+        self.txtPattern.SetToolTip("Text, or bytes as 0xcafe or ca fe")
+        self.btnFind = wx.Button(self, wx.ID_ANY, "Find next")
+        self.btnClear = wx.Button(self, wx.ID_ANY, "Clear")
+        self.lblStatus = wx.StaticText(self, wx.ID_ANY, "")
+
+        self.refreshTimer = wx.Timer(self)
+
+        # offset of the last match, next search continues after it
+        self._lastMatch = -1
+
+        self.__do_layout()
+        self.__bindEvents()
+
+        self.refreshTimer.Start(200)
+
+    def __do_layout(self):
+        szrMain = wx.BoxSizer(wx.VERTICAL)
+
+        szrControls = wx.BoxSizer(wx.HORIZONTAL)
+        szrControls.Add(wx.StaticText(self, wx.ID_ANY, "Offset"), flag=wx.ALIGN_CENTER_VERTICAL | wx.ALL, border=5)
+        szrControls.Add(self.txtOffset, proportion=1, flag=wx.EXPAND)
+        szrControls.Add(self.btnJump, proportion=0, flag=wx.EXPAND)
+        szrControls.Add(wx.StaticText(self, wx.ID_ANY, "Find"), flag=wx.ALIGN_CENTER_VERTICAL | wx.ALL, border=5)
+        szrControls.Add(self.txtPattern, proportion=2, flag=wx.EXPAND)
+        szrControls.Add(self.btnFind, proportion=0, flag=wx.EXPAND)
+        szrControls.Add(self.btnClear, proportion=0, flag=wx.EXPAND)
+
+        szrMain.Add(szrControls, proportion=0, flag=wx.EXPAND)
+        szrMain.Add(self.lstHex, proportion=1, flag=wx.EXPAND)
+        szrMain.Add(self.lblStatus, proportion=0, flag=wx.EXPAND | wx.ALL, border=5)
+
+        self.SetSizer(szrMain)
+        self.Layout()
+
+    def __bindEvents(self):
+        self.Bind(wx.EVT_TIMER, self.OnRefresh, self.refreshTimer)
+        self.Bind(wx.EVT_BUTTON, self.OnJump, self.btnJump)
+        self.Bind(wx.EVT_TEXT_ENTER, self.OnJump, self.txtOffset)
+        self.Bind(wx.EVT_BUTTON, self.OnFind, self.btnFind)
+        self.Bind(wx.EVT_TEXT_ENTER, self.OnFind, self.txtPattern)
+        self.Bind(wx.EVT_BUTTON, self.OnClear, self.btnClear)
+        self.Bind(wx.EVT_CLOSE, self.OnClose)
+
+    ##
+    ## @brief      Select and show the row of an offset
+    ##
+    ## @param      self    The object
+    ## @param      offset  The offset in bytes
+    ##
+    ## @return     None
+    ##
+    def showOffset(self, offset):
+        base = self.capture.getBaseOffset()
+        if offset < base:
+            self.lblStatus.SetLabel("Offset 0x%X has been dropped, data starts at 0x%X" %(offset, base))
+            return
+
+        row = (offset - base) // ROW_BYTES
+        if row >= self.lstHex.GetItemCount():
+            self.lblStatus.SetLabel("Offset 0x%X is beyond %d captured bytes" %(offset, self.capture.getEndOffset()))
+            return
+
+        selected = self.lstHex.GetFirstSelected()
+        if selected >= 0:
+            self.lstHex.Select(selected, on=0)
+        self.lstHex.Select(row)
+        self.lstHex.Focus(row)
+        self.lstHex.EnsureVisible(row)
+
+    def OnRefresh(self, event):
+        self.lstHex.refresh()
+        self.SetTitle("Hex Inspector - %d bytes, from 0x%X" %(len(self.capture), self.capture.getBaseOffset()))
+
+    def OnJump(self, event):
+        try:
+            offset = parseOffset(self.txtOffset.GetValue())
+        except ValueError:
+            self.lblStatus.SetLabel("Invalid offset, use decimal or 0x prefixed hex")
+            return
+
+        self._lastMatch = offset - 1
+        self.showOffset(offset)
+
+    def OnFind(self, event):
+        pattern = parsePattern(self.txtPattern.GetValue())
+
+        start = self._lastMatch + 1
+
+        offset = self.capture.find(pattern, start)
+        if offset < 0 and start > 0:
+            # wrap around
+            offset = self.capture.find(pattern, 0)
+
+        if offset < 0:
+            self.lblStatus.SetLabel("Pattern %s not found" %(pattern.hex(" ")))
+            self._lastMatch = -1
+            return
+
+        self._lastMatch = offset
+
+        self.lblStatus.SetLabel("Found %s at offset 0x%X" %(pattern.hex(" "), offset))
+        self.showOffset(offset)
+
+    def OnClear(self, event):
+        self._lastMatch = -1
+        self.capture.clear()
+        self.lstHex.refresh()
+
+    def OnClose(self, event):
+        self.refreshTimer.Stop()
+
+        if self.onClose is not None:
+            self.onClose()
+
+        self.Destroy()
+
+# end of class frmHexInspector
@@ -0,0 +1,332 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# ----------------------------------------------------------------------------
+#
+# ****************************************************************************
+# (c) Copyright by brainelectronics/ElectronicFuture, ALL RIGHTS RESERVED
+# ****************************************************************************
+#
+#  @author       brainelectronics (info@brainelectronics.de)
+#  @file         jsonExporter.py
+#  @date         October, 2026
+#  @version      0.1.0
+#  @brief        Stream flattened JSON snapshots into CSV, Parquet or Arrow
+#
+#   usage: python3 jsonExporter.py --session logs --device ttyUSB0 out.parquet
+#          python3 jsonExporter.py --capture capture.txt out.csv
+#
+#   used by serialDebugMonitor.py
+#
+#   Rows are buffered in batches of bounded size. The columns are the union
+#   of all flattened keys seen so far. As CSV headers and Arrow schemas can
+#   not be changed after the first rows are written, a new part file
+#   (out.part1.csv, out.part2.csv, ...) is started whenever the schema grows.
+# ----------------------------------------------------------------------------
+
+import argparse
+import csv
+import json
+import logging
+import os
+import time
+
+import flatJson
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# supported output formats by file extension
+FORMAT_EXTENSIONS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+
+class FlatJsonExporter(object):
+    ##
+    ## @brief      Create a new exporter
+    ##
+    ## @param      self             The object
+    ## @param      outputPath       Path of the first output file
+    ## @param      fileFormat       "csv", "parquet" or "arrow", by extension if None
+    ## @param      batchSize        Number of rows kept in memory before writing
+    ## @param      timestampColumn  Name of the host timestamp column, must
+    ##                              not be a key of the flattened snapshots
+    ##
+    def __init__(self,
+                 outputPath,
+                 fileFormat=None,
+                 batchSize=10*1000,
+                 timestampColumn="_host_time"):
+        self.logger = logging.getLogger(__name__)
+
+        if fileFormat is None:
+            extension = os.path.splitext(outputPath)[1].lower()
+            fileFormat = FORMAT_EXTENSIONS.get(extension, "csv")
+        if fileFormat in ("parquet", "arrow") and pyarrow is None:
+            raise RuntimeError("pyarrow is required to export %s" %(fileFormat))
+        if fileFormat not in ("csv", "parquet", "arrow"):
+            raise ValueError("Unknown export format: %s" %(fileFormat))
+
+        self.outputPath = outputPath
+        self.fileFormat = fileFormat
+        self.batchSize = batchSize
+        self.timestampColumn = timestampColumn
+
+        self.exportedRows = 0
+        self.parts = list()
+
+        # union of all keys, in order of appearance
+        self._columns = [timestampColumn]
+        self._knownColumns = set(self._columns)
+        self._rows = list()
+
+        # currently open part
+        self._writer = None
+        self._file = None
+        self._partColumns = None
+        self._partSchema = None
+
+    ##
+    ## @brief      Gets the columns seen so far
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     The list of column names
+    ##
+    def getColumns(self):
+        return list(self._columns)
+
+    ##
+    ## @brief      Add a (nested) JSON snapshot as new row
+    ##
+    ## @param      self       The object
+    ## @param      data       The parsed JSON content
+    ## @param      timestamp  Unix timestamp in seconds, now if None
+    ##
+    ## @return     None, ValueError if the snapshot contains the timestamp
+    ##             column
+    ##
+    def addSnapshot(self, data, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+
+        if isinstance(data, (dict, list)):
+            row = flatJson.flatten_json(data)
+        else:
+            row = {"value": data}
+
+        if self.timestampColumn in row:
+            # never overwrite data of the device
+            raise ValueError("Snapshot contains the timestamp column '%s', use another timestampColumn"
+                             %(self.timestampColumn))
+        row[self.timestampColumn] = timestamp
+
+        for key in row:
+            if key not in self._knownColumns:
+                self._knownColumns.add(key)
+                self._columns.append(key)
+
+        self._rows.append(row)
+        if len(self._rows) >= self.batchSize:
+            self.flush()
+
+    ##
+    ## @brief      Export all snapshots of an iterable
+    ##
+    ## @param      self     The object
+    ## @param      records  Iterable of (timestamp, data) tuples
+    ##
+    ## @return     Number of exported rows
+    ##
+    def exportRecords(self, records):
+        for timestamp, data in records:
+            self.addSnapshot(data, timestamp)
+        self.flush()
+
+        return self.exportedRows
+
+    ##
+    ## @brief      Write all buffered rows
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     None
+    ##
+    def flush(self):
+        if not self._rows:
+            return
+
+        if self.fileFormat == "csv":
+            self._writeCsvBatch(self._rows)
+        else:
+            self._writeArrowBatch(self._rows)
+
+        self.exportedRows += len(self._rows)
+        self._rows = list()
+
+    ##
+    ## @brief      Write remaining rows and close the open part
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     None
+    ##
+    def close(self):
+        self.flush()
+        self._closePart()
+
+        self.logger.info("Exported %d rows to %d file(s)" %(self.exportedRows, len(self.parts)))
+
+    def _getPartPath(self):
+        if not self.parts:
+            return self.outputPath
+
+        base, extension = os.path.splitext(self.outputPath)
+        return "%s.part%d%s" %(base, len(self.parts), extension)
+
+    def _closePart(self):
+        if self._writer is not None and self.fileFormat != "csv":
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+        self._writer = None
+        self._file = None
+        self._partColumns = None
+        self._partSchema = None
+
+    def _writeCsvBatch(self, rows):
+        if self._partColumns != self._columns:
+            # header is written once per file, start a new part
+            self._closePart()
+
+            partPath = self._getPartPath()
+            self._file = open(partPath, "w", newline="")
+            self._partColumns = list(self._columns)
+            self._writer = csv.DictWriter(self._file, fieldnames=self._partColumns, restval="")
+            self._writer.writeheader()
+            self.parts.append(partPath)
+            self.logger.debug("Started %s with %d columns" %(partPath, len(self._partColumns)))
+
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def _buildArrowTable(self, rows):
+        arrays = list()
+
+        for column in self._columns:
+            values = [row.get(column) for row in rows]
+            try:
+                arrays.append(pyarrow.array(values))
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, TypeError, OverflowError):
+                # mixed types in one column, keep them as text
+                values = [None if val is None else str(val) for val in values]
+                arrays.append(pyarrow.array(values, type=pyarrow.string()))
+
+        return pyarrow.Table.from_arrays(arrays, names=list(self._columns))
+
+    def _writeArrowBatch(self, rows):
+        table = self._buildArrowTable(rows)
+
+        if self._partSchema is not None and not table.schema.equals(self._partSchema):
+            # same columns with compatible types can be cast to the open part
+            try:
+                table = table.cast(self._partSchema)
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError, ValueError):
+                self._closePart()
+
+        if self._partSchema is None:
+            partPath = self._getPartPath()
+            self._partSchema = table.schema
+
+            if self.fileFormat == "parquet":
+                self._writer = pyarrow.parquet.ParquetWriter(partPath, self._partSchema)
+            else:
+                self._file = pyarrow.OSFile(partPath, "wb")
+                self._writer = pyarrow.ipc.new_file(self._file, self._partSchema)
+
+            self.parts.append(partPath)
+            self.logger.debug("Started %s with %d columns" %(partPath, len(self._partSchema)))
+
+        self._writer.write_table(table)
+
+# end of class FlatJsonExporter
+
+
+##
+## @brief      Iterate over a capture file of the serial console
+##
+## Lines which are not a JSON object or array are skipped
+##
+## @param      path  The path to the capture file
+##
+## @return     Generator of (timestamp, data) tuples, the timestamp is the
+##             line number as the capture does not contain any time
+##
+def iterCaptureFile(path):
+    with open(path, "r", errors="replace") as captureFile:
+        for lineNumber, line in enumerate(captureFile):
+            line = line.strip()
+            if not line.startswith(("{", "[")):
+                continue
+            try:
+                yield lineNumber, json.loads(line)
+            except ValueError:
+                pass
+
+
+##
+## @brief      Iterate over the JSON snapshots of a session log
+##
+## @param      logDir      The log directory
+## @param      deviceName  The device name used as prefix of the log files
+##
+## @return     Generator of (timestamp, data) tuples
+##
+def iterSessionLog(logDir, deviceName):
+    from sessionLogger import SessionLogReader
+
+    reader = SessionLogReader(logDir=logDir, deviceName=deviceName)
+    for timestamp, kind, data in reader.records(kind="json"):
+        yield timestamp, data
+
+
+def main():
+    logFormat = "[%(asctime)s] [%(levelname)-8s] %(message)s"
+    logging.basicConfig(format=logFormat, level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Export flattened JSON snapshots")
+    parser.add_argument("output", help="Output file, format by extension (.csv, .parquet, .arrow)")
+    parser.add_argument("--session", help="Session log directory")
+    parser.add_argument("--device", default="device", help="Device name of the session log")
+    parser.add_argument("--capture", help="Plain text capture of the serial console")
+    parser.add_argument("--batch-size", type=int, default=10*1000, help="Rows per written batch")
+    parser.add_argument("--timestamp-column", default="_host_time", help="Name of the host timestamp column")
+    args = parser.parse_args()
+
+    if args.session:
+        records = iterSessionLog(args.session, args.device)
+    elif args.capture:
+        records = iterCaptureFile(args.capture)
+    else:
+        parser.error("either --session or --capture is required")
+
+    exporter = FlatJsonExporter(outputPath=args.output,
+                                batchSize=args.batch_size,
+                                timestampColumn=args.timestamp_column)
+    exporter.exportRecords(records)
+    exporter.close()
+
+    for part in exporter.parts:
+        print(part)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# ----------------------------------------------------------------------------
+#
+# ****************************************************************************
+# (c) Copyright by brainelectronics/ElectronicFuture, ALL RIGHTS RESERVED
+# ****************************************************************************
+#
+#  @author       brainelectronics (info@brainelectronics.de)
+#  @file         latencyTracer.py
+#  @date         October, 2026
+#  @version      0.1.0
+#  @brief        Latency from serial arrival to on-screen paint
+#
+#   used by serialDebugMonitor.py
+#
+#   A trace is started as soon as the reading thread sees waiting bytes and
+#   is handed along with the line. Every stage records the time since the
+#   arrival into a histogram of power of two buckets. Data waiting in the
+#   input buffer before the reading thread polls it is not part of a trace,
+#   instead the number of waiting bytes is recorded as input backlog. With
+#   the baudrate it gives the time the oldest of these bytes was waiting.
+#
+#   If the device sends its own timestamp, the offset between host and
+#   device clock is tracked. Its minimum is the best estimate of the fixed
+#   offset plus the minimal link delay, the excess over it is the variable
+#   link delay. The slope of the offset over host time is the clock drift.
+#
+#   While disabled begin() returns None and mark() returns immediately.
+# ----------------------------------------------------------------------------
+
+import time
+
+# stages in order of processing, latency is measured since the arrival
+STAGES = (
+    "readline",         # line completely read by the reading thread
+    "console_handoff",  # console update started in UI thread
+    "console_paint",    # line appended to the console
+    "json_handoff",     # JSON parsing started in UI thread
+    "json_decode",      # line parsed as JSON
+    "list_paint",       # item and detail lists updated
+)
+
+
+class LatencyTrace(object):
+    __slots__ = ("arrival", "arrivalTime", "backlog")
+
+    def __init__(self, backlog=0):
+        self.arrival = time.perf_counter()
+        self.arrivalTime = time.time()
+        self.backlog = backlog
+
+# end of class LatencyTrace
+
+
+class LatencyHistogram(object):
+    # bucket i counts latencies below 2**i microseconds
+    BUCKETS = 32
+
+    ##
+    ## @brief      Create a new histogram
+    ##
+    ## @param      self   The object
+    ## @param      scale  Factor converting a value to bucket units, 1e6 for
+    ##                    seconds in microsecond buckets
+    ##
+    def __init__(self, scale=1e6):
+        self.scale = scale
+        self.reset()
+
+    def reset(self):
+        self.buckets = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    ##
+    ## @brief      Record a latency
+    ##
+    ## @param      self     The object
+    ## @param      seconds  The latency in seconds
+    ##
+    ## @return     None
+    ##
+    def record(self, seconds):
+        units = int(seconds * self.scale)
+        bucket = min(max(units, 0).bit_length(), self.BUCKETS - 1)
+        self.buckets[bucket] += 1
+
+        self.count += 1
+        self.total += seconds
+        if self.minimum is None or seconds < self.minimum:
+            self.minimum = seconds
+        if self.maximum is None or seconds > self.maximum:
+            self.maximum = seconds
+
+    ##
+    ## @brief      Gets the upper bound of a percentile
+    ##
+    ## @param      self     The object
+    ## @param      percent  The percentile, e.g. 99
+    ##
+    ## @return     Upper bound of the percentile's bucket in seconds, or in
+    ##             the unit of the recorded values
+    ##
+    def getPercentile(self, percent):
+        if not self.count:
+            return None
+
+        threshold = self.count * percent / 100.0
+        cumulated = 0
+        for bucket, count in enumerate(self.buckets):
+            cumulated += count
+            if cumulated >= threshold:
+                return min((2 ** bucket) / self.scale, self.maximum)
+
+        return self.maximum
+
+    def getMean(self):
+        return self.total / self.count if self.count else None
+
+# end of class LatencyHistogram
+
+
+class LatencyTracer(object):
+    ##
+    ## @brief      Create a new latency tracer, disabled by default
+    ##
+    ## @param      self             The object
+    ## @param      deviceTimeKey    Dotted path of the device timestamp in the
+    ##                              JSON data, e.g. "system.millis"
+    ## @param      deviceTimeScale  Factor converting it to seconds
+    ##
+    def __init__(self, deviceTimeKey=None, deviceTimeScale=0.001):
+        self.enabled = False
+        self.deviceTimeKey = deviceTimeKey
+        self.deviceTimeScale = deviceTimeScale
+        # baudrate of the connection to convert the backlog into time
+        self.baudrate = None
+
+        self.histograms = dict((stage, LatencyHistogram()) for stage in STAGES)
+        self.linkHistogram = LatencyHistogram()
+        # bytes waiting in the input buffer at the start of a trace
+        self.backlogHistogram = LatencyHistogram(scale=1)
+
+        self._resetClock()
+
+    def _resetClock(self):
+        self.minOffset = None
+        # least squares sums of offset over host time to estimate the drift
+        self._clockStart = None
+        self._firstOffset = 0.0
+        self._n = 0
+        self._sx = 0.0
+        self._sy = 0.0
+        self._sxx = 0.0
+        self._sxy = 0.0
+
+    ##
+    ## @brief      Clear all recorded latencies
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     None
+    ##
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+        self.linkHistogram.reset()
+        self.backlogHistogram.reset()
+        self._resetClock()
+
+    ##
+    ## @brief      Start a trace at the arrival of data
+    ##
+    ## @param      self     The object
+    ## @param      backlog  Number of bytes waiting in the input buffer
+    ##
+    ## @return     The trace, None if tracing is disabled
+    ##
+    def begin(self, backlog=0):
+        if not self.enabled:
+            return None
+
+        self.backlogHistogram.record(backlog)
+
+        return LatencyTrace(backlog)
+
+    ##
+    ## @brief      Record the latency of a stage
+    ##
+    ## @param      self   The object
+    ## @param      trace  The trace returned by begin()
+    ## @param      stage  The name of the stage, see STAGES
+    ##
+    ## @return     None
+    ##
+    def mark(self, trace, stage):
+        if trace is None:
+            return
+
+        self.histograms[stage].record(time.perf_counter() - trace.arrival)
+
+    ##
+    ## @brief      Correlate the arrival with the device timestamp
+    ##
+    ## @param      self   The object
+    ## @param      trace  The trace returned by begin()
+    ## @param      data   The parsed JSON data
+    ##
+    ## @return     None
+    ##
+    def recordDeviceTime(self, trace, data):
+        if trace is None or self.deviceTimeKey is None:
+            return
+
+        value = data
+        for part in self.deviceTimeKey.split("."):
+            if not isinstance(value, dict) or part not in value:
+                return
+            value = value[part]
+
+        try:
+            deviceTime = float(value) * self.deviceTimeScale
+        except (TypeError, ValueError):
+            return
+
+        offset = trace.arrivalTime - deviceTime
+        if self.minOffset is None or offset < self.minOffset:
+            self.minOffset = offset
+        self.linkHistogram.record(offset - self.minOffset)
+
+        if self._clockStart is None:
+            self._clockStart = trace.arrivalTime
+            self._firstOffset = offset
+        x = trace.arrivalTime - self._clockStart
+        y = offset - self._firstOffset
+        self._n += 1
+        self._sx += x
+        self._sy += y
+        self._sxx += x * x
+        self._sxy += x * y
+
+    ##
+    ## @brief      Gets the clock drift of the device
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     Drift in ppm, positive if the device clock is slower
+    ##
+    def getDrift(self):
+        denominator = self._n * self._sxx - self._sx * self._sx
+        if self._n < 2 or denominator <= 0:
+            return None
+
+        slope = (self._n * self._sxy - self._sx * self._sy) / denominator
+        return slope * 1e6
+
+    ##
+    ## @brief      Gets a text report of all stages
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     The report
+    ##
+    def getReport(self):
+        lines = list()
+        lines.append("%-16s %8s %10s %10s %10s %10s" %("stage", "count", "mean ms", "p50 ms", "p99 ms", "max ms"))
+
+        rows = [(stage, self.histograms[stage]) for stage in STAGES]
+        if self.deviceTimeKey is not None:
+            rows.append(("link (excess)", self.linkHistogram))
+
+        for name, histogram in rows:
+            if not histogram.count:
+                lines.append("%-16s %8d" %(name, 0))
+                continue
+
+            lines.append("%-16s %8d %10.3f %10.3f %10.3f %10.3f"
+                         %(name,
+                           histogram.count,
+                           histogram.getMean() * 1e3,
+                           histogram.getPercentile(50) * 1e3,
+                           histogram.getPercentile(99) * 1e3,
+                           histogram.maximum * 1e3))
+
+        backlog = self.backlogHistogram
+        if backlog.count:
+            line = "input backlog: mean %.0f, p99 %d, max %d bytes" %(
+                backlog.getMean(), backlog.getPercentile(99), backlog.maximum)
+            if self.baudrate:
+                # 10 bits per byte with start and stop bit
+                line += ", up to %.1f ms waiting" %(backlog.maximum * 10.0 / self.baudrate * 1e3)
+            lines.append(line)
+
+        drift = self.getDrift()
+        if drift is not None:
+            lines.append("clock drift: %.1f ppm" %(drift))
+
+        return "\n".join(lines)
+
+# end of class LatencyTracer
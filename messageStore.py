@@ -0,0 +1,313 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# ----------------------------------------------------------------------------
+#
+# ****************************************************************************
+# (c) Copyright by brainelectronics/ElectronicFuture, ALL RIGHTS RESERVED
+# ****************************************************************************
+#
+#  @author       brainelectronics (info@brainelectronics.de)
+#  @file         messageStore.py
+#  @date         October, 2026
+#  @version      0.1.0
+#  @brief        Compact history of received lines in contiguous chunks
+#
+#   usage: python3 messageStore.py [--lines 10000000]
+#          runs a memory benchmark of the retained history
+#
+#   used by serialDebugMonitor.py
+#
+#   Lines are copied into large preallocated bytearrays ("chunks"). Per line
+#   only its end offset (4 bytes) and its unix timestamp in microseconds
+#   (8 bytes) are stored in parallel arrays. Reading a line returns a
+#   memoryview slice of its chunk, no copy is made.
+# ----------------------------------------------------------------------------
+
+import argparse
+import array
+import bisect
+import datetime
+import threading
+import time
+import tracemalloc
+
+
+class MessageRecord(object):
+    __slots__ = ("index", "timestamp", "message")
+
+    ##
+    ## @brief      A single line of the history
+    ##
+    ## @param      self       The object
+    ## @param      index      The index of the line in the store
+    ## @param      timestamp  Unix timestamp in microseconds
+    ## @param      message    The line as memoryview
+    ##
+    def __init__(self, index, timestamp, message):
+        self.index = index
+        self.timestamp = timestamp
+        self.message = message
+
+    ##
+    ## @brief      Gets the timestamp as string.
+    ##
+    ## Format is Hour:Minutes:Seconds:Microseconds
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     The timestamp as string.
+    ##
+    def getTimeString(self):
+        return datetime.datetime.fromtimestamp(self.timestamp / 1e6).strftime("%H:%M:%S:%f")
+
+    ##
+    ## @brief      Gets the message as text.
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     The decoded message
+    ##
+    def getText(self):
+        return str(self.message, "utf-8", "replace")
+
+# end of class MessageRecord
+
+
+class MessageChunk(object):
+    __slots__ = ("data", "used", "offsets", "timestamps", "firstIndex")
+
+    def __init__(self, size, firstIndex):
+        self.data = bytearray(size)
+        self.used = 0
+        # end offset of each line, start is the end of the previous line
+        self.offsets = array.array("I")
+        self.timestamps = array.array("q")
+        self.firstIndex = firstIndex
+
+    def getFreeBytes(self):
+        return len(self.data) - self.used
+
+    def getSlice(self, localIndex):
+        start = self.offsets[localIndex - 1] if localIndex else 0
+        return memoryview(self.data)[start:self.offsets[localIndex]]
+
+# end of class MessageChunk
+
+
+class MessageStore(object):
+    ##
+    ## @brief      Create a new message store
+    ##
+    ## @param      self        The object
+    ## @param      chunkBytes  Size of a single chunk in bytes
+    ## @param      maxChunks   Drop the oldest chunk above this, None to keep all
+    ##
+    def __init__(self, chunkBytes=4*1024*1024, maxChunks=None):
+        self.chunkBytes = chunkBytes
+        self.maxChunks = maxChunks
+
+        self._chunks = list()
+        self._chunkStarts = list()
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    ##
+    ## @brief      Gets the index of the oldest retained line
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     The first index.
+    ##
+    def getFirstIndex(self):
+        with self._lock:
+            return self._chunkStarts[0] if self._chunks else self._count
+
+    ##
+    ## @brief      Add a line to the store
+    ##
+    ## @param      self       The object
+    ## @param      message    The line as bytes
+    ## @param      timestamp  Unix timestamp in microseconds, now if None
+    ##
+    ## @return     The index of the line
+    ##
+    def append(self, message, timestamp=None):
+        if timestamp is None:
+            timestamp = int(time.time()*1000*1000)
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+
+        size = len(message)
+
+        with self._lock:
+            if not self._chunks or self._chunks[-1].getFreeBytes() < size:
+                self._addChunk(max(self.chunkBytes, size))
+
+            chunk = self._chunks[-1]
+            end = chunk.used + size
+            chunk.data[chunk.used:end] = message
+            chunk.used = end
+            chunk.offsets.append(end)
+            chunk.timestamps.append(timestamp)
+
+            index = self._count
+            self._count += 1
+
+        return index
+
+    ##
+    ## @brief      Gets a line of the store
+    ##
+    ## @param      self   The object
+    ## @param      index  The index of the line
+    ##
+    ## @return     The record, IndexError if already dropped
+    ##
+    def getRecord(self, index):
+        with self._lock:
+            chunk, localIndex = self._locate(index)
+            return MessageRecord(index, chunk.timestamps[localIndex], chunk.getSlice(localIndex))
+
+    ##
+    ## @brief      Iterate over the retained lines
+    ##
+    ## @param      self   The object
+    ## @param      start  Index of the first line, oldest if None
+    ## @param      stop   Index after the last line, newest if None
+    ##
+    ## @return     Generator of MessageRecord objects
+    ##
+    def iterRecords(self, start=None, stop=None):
+        index = self.getFirstIndex() if start is None else max(start, self.getFirstIndex())
+        stop = self._count if stop is None else min(stop, self._count)
+
+        while index < stop:
+            try:
+                yield self.getRecord(index)
+            except IndexError:
+                # dropped meanwhile, continue with oldest retained line
+                index = self.getFirstIndex()
+                continue
+            index += 1
+
+    ##
+    ## @brief      Search lines containing a pattern
+    ##
+    ## The chunks are searched as a whole, only matching lines are sliced
+    ##
+    ## @param      self     The object
+    ## @param      pattern  The bytes to search for
+    ## @param      start    Index of the first line to search
+    ##
+    ## @return     Generator of indices of matching lines
+    ##
+    def search(self, pattern, start=0):
+        if isinstance(pattern, str):
+            pattern = pattern.encode("utf-8")
+
+        with self._lock:
+            chunks = list(self._chunks)
+
+        for chunk in chunks:
+            lineCount = len(chunk.offsets)
+            if chunk.firstIndex + lineCount <= start:
+                continue
+
+            localIndex = max(start - chunk.firstIndex, 0)
+            position = chunk.offsets[localIndex - 1] if localIndex else 0
+            used = chunk.offsets[lineCount - 1] if lineCount else 0
+
+            while True:
+                position = chunk.data.find(pattern, position, used)
+                if position < 0:
+                    break
+
+                localIndex = bisect.bisect_right(chunk.offsets, position, 0, lineCount)
+                yield chunk.firstIndex + localIndex
+
+                # continue after the end of the matching line
+                position = chunk.offsets[localIndex]
+
+    ##
+    ## @brief      Gets the memory used by the store
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     The allocated bytes of all chunks and index arrays
+    ##
+    def getMemoryUsage(self):
+        with self._lock:
+            return sum(len(c.data) +
+                       c.offsets.buffer_info()[1] * c.offsets.itemsize +
+                       c.timestamps.buffer_info()[1] * c.timestamps.itemsize
+                       for c in self._chunks)
+
+    def _addChunk(self, size):
+        chunk = MessageChunk(size, self._count)
+        self._chunks.append(chunk)
+        self._chunkStarts.append(chunk.firstIndex)
+
+        if self.maxChunks is not None and len(self._chunks) > self.maxChunks:
+            self._chunks.pop(0)
+            self._chunkStarts.pop(0)
+
+    def _locate(self, index):
+        if not self._chunks or index < self._chunkStarts[0] or index >= self._count:
+            raise IndexError("Message %d is not retained" %(index))
+
+        chunkIndex = bisect.bisect_right(self._chunkStarts, index) - 1
+        chunk = self._chunks[chunkIndex]
+
+        return chunk, index - chunk.firstIndex
+
+# end of class MessageStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory benchmark of the message history")
+    parser.add_argument("--lines", type=int, default=10*1000*1000)
+    parser.add_argument("--sample", type=int, default=100*1000,
+                        help="Lines used to measure the per-line dict approach")
+    args = parser.parse_args()
+
+    line = b'{"evse":{"state":2,"current":16.0,"voltage":[230,231,229]}}\r\n'
+    timestamp = int(time.time()*1000*1000)
+
+    # per-line dicts as previously created by read() and kept in a list
+    tracemalloc.start()
+    history = list()
+    for i in range(args.sample):
+        messageDict = dict()
+        messageDict["timestamp"] = datetime.datetime.now().strftime("%H:%M:%S:%f")
+        messageDict["message"] = bytes(line)
+        history.append(messageDict)
+    dictBytes = tracemalloc.get_traced_memory()[0] / float(args.sample)
+    tracemalloc.stop()
+    del history
+
+    store = MessageStore()
+    startTime = time.time()
+    for i in range(args.lines):
+        store.append(line, timestamp + i)
+    appendTime = time.time() - startTime
+
+    startTime = time.time()
+    matches = sum(1 for _ in store.search(b'"state":3'))
+    searchTime = time.time() - startTime
+
+    storeBytes = store.getMemoryUsage()
+    overhead = (storeBytes - args.lines * len(line)) / float(args.lines)
+
+    print("line length:          %d bytes" %(len(line)))
+    print("dict per line:        %.1f bytes (measured on %d lines)" %(dictBytes, args.sample))
+    print("dict, %d lines:   %.1f MB (extrapolated)" %(args.lines, dictBytes * args.lines / 1e6))
+    print("store, %d lines:  %.1f MB" %(args.lines, storeBytes / 1e6))
+    print("store overhead:       %.1f bytes per line" %(overhead))
+    print("append:               %.2f s (%.0f lines/s)" %(appendTime, args.lines / appendTime))
+    print("search:               %.2f s (%d matches)" %(searchTime, matches))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# ----------------------------------------------------------------------------
+#
+# ****************************************************************************
+# (c) Copyright by brainelectronics/ElectronicFuture, ALL RIGHTS RESERVED
+# ****************************************************************************
+#
+#  @author       brainelectronics (info@brainelectronics.de)
+#  @file         ruleEngine.py
+#  @date         October, 2026
+#  @version      0.1.0
+#  @brief        Trigger and alert rules over flattened JSON fields
+#
+#   used by serialDebugMonitor.py
+#
+#   A rule watches a single flattened key, e.g. "evse_current > 16". Rules
+#   are compiled into a predicate once and indexed by their key. For every
+#   snapshot only the rules of keys whose value changed are evaluated, so
+#   the time per snapshot does not grow with the number of rules.
+#
+#   Rules file (JSON):
+#   [
+#       {"name": "over-current", "when": "evse_current > 16", "actions": ["highlight", "log"]},
+#       {"name": "state", "when": "evse_state changed", "actions": ["log"]},
+#       {"name": "error", "when": "evse_error != 0", "actions": ["capture"]}
+#   ]
+#
+#   Supported operators: > >= < <= == != changed contains matches
+# ----------------------------------------------------------------------------
+
+import collections
+import json
+import logging
+import operator
+import re
+import time
+
+import flatJson
+
+COMPARISONS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+ACTIONS = ("highlight", "log", "capture")
+
+# key, operator and optional value of a rule expression
+EXPRESSION_PATTERN = re.compile(r"^\s*(\S+)\s+(>=|<=|==|!=|>|<|changed|contains|matches)\s*(.*?)\s*$")
+
+# old value of a key not present in the previous snapshot
+MISSING = object()
+
+RuleMatch = collections.namedtuple("RuleMatch", ["rule", "key", "topKey", "oldValue", "newValue", "timestamp"])
+
+
+class Rule(object):
+    __slots__ = ("name", "expression", "key", "predicate", "actions", "edge", "active")
+
+    def __init__(self, name, expression, key, predicate, actions, edge):
+        self.name = name
+        self.expression = expression
+        self.key = key
+        self.predicate = predicate
+        self.actions = actions
+        self.edge = edge
+        self.active = False
+
+# end of class Rule
+
+
+##
+## @brief      Compile a rule expression into its key and a predicate
+##
+## @param      expression  The expression, e.g. "evse_current > 16"
+##
+## @return     Tuple of key, predicate(oldValue, newValue) and whether it
+##             matches on changes, ValueError if the expression is invalid
+##
+def compileExpression(expression):
+    match = EXPRESSION_PATTERN.match(expression)
+    if match is None:
+        raise ValueError("Invalid rule expression: %s" %(expression))
+
+    key, op, valueText = match.groups()
+
+    if op == "changed":
+        # any change of a present value (including null), the key is only
+        # evaluated if changed
+        return key, (lambda oldValue, newValue: oldValue is not MISSING), True
+
+    if not valueText:
+        raise ValueError("Missing value in rule expression: %s" %(expression))
+
+    if op == "matches":
+        try:
+            regex = re.compile(valueText)
+        except re.error as e:
+            raise ValueError("Invalid regex in rule expression: %s (%s)" %(expression, e))
+        return key, (lambda oldValue, newValue: regex.search(str(newValue)) is not None), False
+
+    try:
+        value = json.loads(valueText)
+    except ValueError:
+        # unquoted strings are fine as well
+        value = valueText
+
+    if op == "contains":
+        text = str(value)
+        return key, (lambda oldValue, newValue: text in str(newValue)), False
+
+    compare = COMPARISONS[op]
+    return key, (lambda oldValue, newValue: compare(newValue, value)), False
+
+
+class RuleEngine(object):
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+        self.rules = list()
+        self.evaluations = 0
+
+        # rules by the flattened key they depend on
+        self._index = collections.defaultdict(list)
+        self._previous = dict()
+        # active rules with a highlight action
+        self._highlighted = set()
+
+    ##
+    ## @brief      Add a new rule
+    ##
+    ## @param      self        The object
+    ## @param      name        The name of the rule
+    ## @param      expression  The expression, e.g. "evse_current > 16"
+    ## @param      actions     List of "highlight", "log" or "capture"
+    ## @param      edge        Only match if the expression becomes true,
+    ##                         always False for "changed" rules
+    ##
+    ## @return     The compiled rule
+    ##
+    def addRule(self, name, expression, actions=("log",), edge=True):
+        rule = self._compileRule(name, expression, actions, edge)
+
+        self.rules.append(rule)
+        self._index[rule.key].append(rule)
+
+        return rule
+
+    def _compileRule(self, name, expression, actions, edge):
+        if not isinstance(actions, (list, tuple)) or not isinstance(expression, str):
+            raise ValueError("Invalid expression or actions of rule %s" %(name))
+
+        for action in actions:
+            if action not in ACTIONS:
+                raise ValueError("Unknown action '%s' of rule %s" %(action, name))
+
+        key, predicate, onChange = compileExpression(expression)
+
+        # a change is an event of its own, it never stays active
+        return Rule(name, expression, key, predicate, tuple(actions), edge and not onChange)
+
+    ##
+    ## @brief      Remove all rules
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     None
+    ##
+    def clearRules(self):
+        self.rules = list()
+        self._index = collections.defaultdict(list)
+        self._highlighted = set()
+
+    ##
+    ## @brief      Load rules from a JSON file
+    ##
+    ## @param      self  The object
+    ## @param      path  The path to the rules file
+    ##
+    ## @return     Number of loaded rules, IOError or ValueError if the file
+    ##             is invalid. The current rules are kept in this case
+    ##
+    def loadRules(self, path):
+        with open(path, "r") as rulesFile:
+            rules = json.load(rulesFile)
+
+        if not isinstance(rules, list):
+            raise ValueError("Rules file %s must contain a list of rules" %(path))
+
+        # compile all rules before replacing the current ones
+        compiledRules = list()
+        index = collections.defaultdict(list)
+        for idx, ruleDict in enumerate(rules):
+            if not isinstance(ruleDict, dict) or "when" not in ruleDict:
+                raise ValueError("Rule %d of %s needs a 'when' expression" %(idx, path))
+
+            rule = self._compileRule(name=ruleDict.get("name", "rule%d" %(idx)),
+                                     expression=ruleDict["when"],
+                                     actions=ruleDict.get("actions", ["log"]),
+                                     edge=ruleDict.get("edge", True))
+            compiledRules.append(rule)
+            index[rule.key].append(rule)
+
+        self.rules = compiledRules
+        self._index = index
+        self._highlighted = set()
+
+        self.logger.info("Loaded %d rules from %s" %(len(rules), path))
+
+        return len(rules)
+
+    ##
+    ## @brief      Evaluate the rules of all changed keys of a snapshot
+    ##
+    ## @param      self       The object
+    ## @param      snapshot   The parsed JSON snapshot
+    ## @param      timestamp  Unix timestamp in seconds, now if None
+    ##
+    ## @return     List of RuleMatch
+    ##
+    def evaluate(self, snapshot, timestamp=None):
+        if not self._index or not isinstance(snapshot, dict):
+            return list()
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        # flatten each top level entry to know where a key belongs to
+        current = dict()
+        for topKey, value in snapshot.items():
+            if isinstance(value, (dict, list)):
+                for key, flatValue in flatJson.flatten_json({topKey: value}).items():
+                    current[key] = (topKey, flatValue)
+            else:
+                current[topKey] = (topKey, value)
+
+        matches = list()
+        index = self._index
+        previous = self._previous
+
+        for key, entry in current.items():
+            rules = index.get(key)
+            if rules is None:
+                continue
+
+            oldEntry = previous.get(key)
+            oldValue = MISSING if oldEntry is None else oldEntry[1]
+            newValue = entry[1]
+            # compare the type as well, 1 == 1.0 == True
+            if type(oldValue) is type(newValue) and oldValue == newValue:
+                continue
+
+            for rule in rules:
+                self._evaluateRule(rule, key, entry[0], oldValue, newValue, timestamp, matches)
+
+        # keys vanished from the snapshot deactivate their rules
+        for key in set(previous) - set(current):
+            for rule in index.get(key, ()):
+                rule.active = False
+                self._highlighted.discard(rule)
+
+        self._previous = current
+
+        return matches
+
+    ##
+    ## @brief      Gets the top level keys of active highlight rules
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     Set of top level keys
+    ##
+    def getHighlightedKeys(self):
+        keys = set()
+        for rule in self._highlighted:
+            entry = self._previous.get(rule.key)
+            if entry is not None:
+                keys.add(entry[0])
+
+        return keys
+
+    def _evaluateRule(self, rule, key, topKey, oldValue, newValue, timestamp, matches):
+        self.evaluations += 1
+
+        try:
+            result = bool(rule.predicate(oldValue, newValue))
+        except TypeError:
+            # e.g. comparing a string with a number
+            result = False
+
+        wasActive = rule.active
+        rule.active = result
+
+        if "highlight" in rule.actions:
+            if result:
+                self._highlighted.add(rule)
+            else:
+                self._highlighted.discard(rule)
+
+        if result and (not rule.edge or not wasActive):
+            if oldValue is MISSING:
+                oldValue = None
+            matches.append(RuleMatch(rule, key, topKey, oldValue, newValue, timestamp))
+
+# end of class RuleEngine
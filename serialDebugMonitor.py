@@ -28,9 +28,11 @@
 # POSSIBILITY OF SUCH DAMAGE.
 # ----------------------------------------------------------------------------
 
+import argparse
 import logging
 import datetime
 import json
+import os
 import queue
 import random
 
@@ -45,6 +47,20 @@ import time
 from wx import TextCtrl
 from wx import adv
 
+import flatJson
+from connectionSupervisor import ConnectionSupervisor
+from detailCache import DetailRowCache, CACHE_HIT, CACHE_PARTIAL
+from hexInspector import ByteCapture, frmHexInspector
+from jsonExporter import FlatJsonExporter
+from latencyTracer import LatencyTracer
+from messageStore import MessageStore
+from ruleEngine import RuleEngine
+from sessionLogger import SessionLogger
+from sharedStatePublisher import SharedStatePublisher
+from snapshotHistory import SnapshotHistory
+from stageProfiler import StageProfiler, PROFILE_CPROFILE, PROFILE_SAMPLING
+from tcpBridge import SerialBridge
+
 # begin wxGlade: dependencies
 # end wxGlade
 
@@ -63,6 +79,14 @@ class frmSerialMonitor(wx.Frame):
         self.startTime = datetime.datetime.now()    # time of application start
         self.logger.debug("Starting app at %s ..." %self.startTime)
 
+        # profiling requested on the command line
+        profileMode = kwds.pop("profileMode", None)
+        traceAllocations = kwds.pop("traceAllocations", False)
+        profileDuration = kwds.pop("profileDuration", None)
+        profileDir = kwds.pop("profileDir", "profiles")
+        deviceTimeKey = kwds.pop("deviceTimeKey", None)
+        deviceTimeScale = kwds.pop("deviceTimeScale", 0.001)
+
         # begin wxGlade: frmSerialMonitor.__init__
         kwds["style"] = kwds.get("style", 0) | wx.DEFAULT_FRAME_STYLE
 
@@ -156,14 +180,94 @@ class frmSerialMonitor(wx.Frame):
             "Submit")
         self.btnSubmit.Disable()
 
+        # timeline to scrub through the history of JSON snapshots
+        self.sldTimeline = wx.Slider(
+            self,
+            wx.ID_ANY,
+            value=0,
+            minValue=0,
+            maxValue=1,
+            style=wx.SL_HORIZONTAL)
+        # enabled as soon as there are two snapshots to choose from
+        self.sldTimeline.Disable()
+        self.lblTimeline = wx.StaticText(
+            self,
+            wx.ID_ANY,
+            "Live")
+        self.btnLive = wx.Button(
+            self,
+            wx.ID_ANY,
+            "Live")
+        self.btnLive.Disable()
+
         self._receivingThread = None
         self._runReadThread = False
         self._conn = None
+        self._supervisor = None
         self._recievedQueue = queue.Queue()
         self.maxSerialChars = 10*1000
 
+        # history of all received lines, up to 64 chunks of 4MB
+        self.messageStore = MessageStore(maxChunks=64)
+
+        # latency from serial arrival to paint, disabled by default
+        self.latencyTracer = LatencyTracer(deviceTimeKey=deviceTimeKey, deviceTimeScale=deviceTimeScale)
+
+        # raw mode keeps received data as bytes for the hex inspector
+        self.rawMode = False
+        # up to 64 chunks of 1MB, the oldest data is dropped
+        self.byteCapture = ByteCapture(maxChunks=64)
+        self.hexInspector = None
+
         self.debugInfoDict = dict()
 
+        # latest JSON snapshots, unchanged subtrees are shared between them
+        self.snapshotHistory = SnapshotHistory(maxSnapshots=10*1000)
+        self.timelineLive = True
+        self.timelineDropped = 0
+
+        # rows of the detail list, repainted only if the subtree changed
+        self.detailCache = DetailRowCache(flatten=self.flatten_json)
+
+        # profile the named stages on request, stages are only wrapped
+        # while a run is active
+        self.stageProfiler = StageProfiler(outputDir=profileDir)
+        self.stageProfiler.instrument("reader_loop", self, "readOnce")
+        self.stageProfiler.instrument("json_decode", self, "decodeJson")
+        # every module calls flatJson.flatten_json at call time, so all
+        # flattening is attributed to this stage
+        self.stageProfiler.instrument("flatten", flatJson, "flatten_json")
+        self.stageProfiler.instrument("console_render", self, "fillSerialConsole")
+        self.stageProfiler.instrument("list_refresh", self, "showDebugItems")
+        self.profileMode = profileMode or PROFILE_CPROFILE
+        self.traceAllocations = traceAllocations
+        self.mnuProfiling = None
+
+        # persist console and JSON data, created on user request
+        self.sessionLogger = None
+        self.sessionLogDir = "logs"
+
+        # export flattened JSON snapshots, created on user request
+        self.jsonExporter = None
+
+        # share raw stream and JSON snapshots with local clients
+        self.serialBridge = None
+        self.bridgeHost = "127.0.0.1"
+        self.bridgeRawPort = 7000
+        self.bridgeJsonPort = 7001
+        self.bridgeWebsocketPort = 7002
+
+        # publish latest flattened snapshot to local processes
+        self.statePublisher = None
+        self.sharedMemoryName = "serialDebugMonitor"
+
+        # trigger and alert rules over the flattened JSON fields
+        self.ruleEngine = RuleEngine()
+        self.rulesPath = "rules.json"
+        self.captureDir = "captures"
+        self.captureLines = 1000
+        self.highlightColour = wx.Colour(255, 200, 200)
+
         self.redrawTimer = wx.Timer(self)
         self.comTimer = wx.Timer(self)
 
@@ -171,11 +275,18 @@ class frmSerialMonitor(wx.Frame):
         self.activeUserSelection["item"] = 0
         self.activeUserSelection["detail"] = 0
 
+        # start before __do_layout connects and starts reading
+        if profileMode is not None or traceAllocations:
+            self.startProfiling(mode=profileMode, traceMemory=traceAllocations, duration=profileDuration)
+
         self.__set_properties()
         self.__do_layout()
         self.__create_menu()
         self.CreateStatusBar() # Statusbar at the bottom of the window
         self.__bindEvents()
+
+        if os.path.isfile(self.rulesPath):
+            self.loadRules(self.rulesPath)
         # self.__bindTimer()
 
     def __bindEvents(self):
@@ -216,6 +327,16 @@ class frmSerialMonitor(wx.Frame):
             wx.EVT_LIST_ITEM_SELECTED,
             self.OnDetailSelected)
 
+        self.Bind(
+            wx.EVT_SLIDER,
+            self.OnTimelineScrolled,
+            self.sldTimeline)
+
+        self.Bind(
+            wx.EVT_BUTTON,
+            self.OnTimelineLive,
+            self.btnLive)
+
         self.Bind(
             wx.EVT_PAINT,
             self.OnPaint)
@@ -293,6 +414,22 @@ class frmSerialMonitor(wx.Frame):
             flag=wx.EXPAND,
             border=10)
 
+        # add horizontal box sizer containing the snapshot timeline
+        szrTimeline = wx.BoxSizer(wx.HORIZONTAL)
+        szrTimeline.Add(
+            self.sldTimeline,
+            proportion=1,
+            flag=wx.EXPAND)
+        szrTimeline.Add(
+            self.lblTimeline,
+            proportion=0,
+            flag=wx.ALIGN_CENTER_VERTICAL | wx.LEFT | wx.RIGHT,
+            border=5)
+        szrTimeline.Add(
+            self.btnLive,
+            proportion=0,
+            flag=wx.EXPAND)
+
         # add szrList to main box sizer
         szrMain.Add(
             szrList,
@@ -300,6 +437,13 @@ class frmSerialMonitor(wx.Frame):
             flag=wx.EXPAND,
             border=10)
 
+        # add szrTimeline to main box sizer
+        szrMain.Add(
+            szrTimeline,
+            proportion=0,
+            flag=wx.EXPAND,
+            border=10)
+
         # add text input for outgoing data to main box sizer
         szrMain.Add(
             self.txtSubmitString,
@@ -347,6 +491,97 @@ class frmSerialMonitor(wx.Frame):
             "&Quit")
         self.Bind(wx.EVT_MENU, self.OnClose, item)
 
+        FileMenu.AppendSeparator()
+        item = FileMenu.AppendCheckItem(
+            wx.ID_ANY,
+            "&Session log\tCtrl-L",
+            "Write console and JSON data to rotating, compressed logs")
+        self.Bind(wx.EVT_MENU, self.OnToggleSessionLog, item)
+
+        self.mnuJsonExport = FileMenu.AppendCheckItem(
+            wx.ID_ANY,
+            "&Export JSON...\tCtrl-E",
+            "Export flattened JSON snapshots as CSV, Parquet or Arrow")
+        self.Bind(wx.EVT_MENU, self.OnToggleJsonExport, self.mnuJsonExport)
+        MenuBar.Append(FileMenu, "&File")
+
+        # tools menu
+        ToolsMenu = wx.Menu()
+        item = ToolsMenu.AppendCheckItem(
+            wx.ID_ANY,
+            "&TCP bridge",
+            "Rebroadcast raw stream and JSON snapshots to local TCP/WebSocket clients")
+        self.Bind(wx.EVT_MENU, self.OnToggleBridge, item)
+
+        item = ToolsMenu.AppendCheckItem(
+            wx.ID_ANY,
+            "&Shared memory",
+            "Publish the latest flattened snapshot to local processes via shared memory")
+        self.Bind(wx.EVT_MENU, self.OnToggleStatePublisher, item)
+
+        item = ToolsMenu.Append(
+            wx.ID_ANY,
+            "&Hex inspector\tCtrl-H",
+            "Switch to raw mode and inspect received bytes as hex and ASCII")
+        self.Bind(wx.EVT_MENU, self.OnOpenHexInspector, item)
+
+        item = ToolsMenu.Append(
+            wx.ID_ANY,
+            "&Load rules...",
+            "Load trigger and alert rules from a JSON file")
+        self.Bind(wx.EVT_MENU, self.OnLoadRules, item)
+        MenuBar.Append(ToolsMenu, "&Tools")
+
+        # diagnostics menu
+        DiagnosticsMenu = wx.Menu()
+        item = DiagnosticsMenu.AppendCheckItem(
+            wx.ID_ANY,
+            "&Latency tracing",
+            "Measure latency from serial arrival to on-screen paint")
+        self.Bind(wx.EVT_MENU, self.OnToggleLatencyTracing, item)
+
+        item = DiagnosticsMenu.Append(
+            wx.ID_ANY,
+            "Latency &report",
+            "Show latency histograms of all stages")
+        self.Bind(wx.EVT_MENU, self.OnLatencyReport, item)
+
+        item = DiagnosticsMenu.Append(
+            wx.ID_ANY,
+            "&Device time key...",
+            "Key of the device timestamp to estimate link delay and clock drift")
+        self.Bind(wx.EVT_MENU, self.OnSetDeviceTimeKey, item)
+
+        DiagnosticsMenu.AppendSeparator()
+        self.mnuProfiling = DiagnosticsMenu.AppendCheckItem(
+            wx.ID_ANY,
+            "&Profile stages\tCtrl-P",
+            "Profile reader loop, JSON decode, flatten, console render and list refresh")
+        self.mnuProfiling.Check(self.stageProfiler.isRunning())
+        self.Bind(wx.EVT_MENU, self.OnToggleProfiling, self.mnuProfiling)
+
+        item = DiagnosticsMenu.AppendRadioItem(
+            wx.ID_ANY,
+            "&cProfile",
+            "Profile every call of the stages with cProfile")
+        item.Check(self.profileMode == PROFILE_CPROFILE)
+        self.Bind(wx.EVT_MENU, lambda event: self.OnSelectProfiler(PROFILE_CPROFILE), item)
+
+        item = DiagnosticsMenu.AppendRadioItem(
+            wx.ID_ANY,
+            "&Sampling",
+            "Sample the stacks of the stages, lower overhead than cProfile")
+        item.Check(self.profileMode == PROFILE_SAMPLING)
+        self.Bind(wx.EVT_MENU, lambda event: self.OnSelectProfiler(PROFILE_SAMPLING), item)
+
+        item = DiagnosticsMenu.AppendCheckItem(
+            wx.ID_ANY,
+            "Trace &allocations",
+            "Trace memory allocations with tracemalloc while profiling")
+        item.Check(self.traceAllocations)
+        self.Bind(wx.EVT_MENU, self.OnToggleTraceAllocations, item)
+        MenuBar.Append(DiagnosticsMenu, "&Diagnostics")
+
         # help menu
         HelpMenu = wx.Menu()
         # this gets put in the App menu on OS-X
@@ -376,6 +611,25 @@ class frmSerialMonitor(wx.Frame):
 
             self.stopReceivingThread()
 
+            if self.stageProfiler.isRunning():
+                self.stopProfiling()
+
+            if self.sessionLogger is not None:
+                self.sessionLogger.stop()
+                self.sessionLogger = None
+
+            if self.jsonExporter is not None:
+                self.jsonExporter.close()
+                self.jsonExporter = None
+
+            if self.serialBridge is not None:
+                self.serialBridge.stop()
+                self.serialBridge = None
+
+            if self.statePublisher is not None:
+                self.statePublisher.close()
+                self.statePublisher = None
+
             self.logger.debug("all tasks are stopped")
         except Exception as e:
             self.logger.warning(e)
@@ -406,42 +660,101 @@ class frmSerialMonitor(wx.Frame):
         # create endless reading loop in a seperate thread.
         # kill it by calling stopReadingThread()
 
+        supervisor = ConnectionSupervisor(
+            connection=connection,
+            onLost=self.OnConnectionLost,
+            onRestored=self.OnConnectionRestored)
+        self._supervisor = supervisor
+
         # change this variable to stop this thread
         # https://stackoverflow.com/questions/18018033/how-to-stop-a-looping-thread-in-python
         while self._runReadThread:
-            if connection and connection.isOpen():
-                # for PySerial v3.0 or later, use property "in_waiting"
-                # instead of function inWaiting()
-                # https://stackoverflow.com/questions/17553543/pyserial-non-blocking-read-loop
-
-                unixMicros = self.getCurrentTime()
-                # unixMicros = self.getUnixMicrosTimestamp()
-                line = ""
+            if not supervisor.isConnected():
+                # board reset or USB link lost, wait for the port to return.
+                # Console content and parsed data are kept meanwhile
+                if not supervisor.reconnect(isRunning=self.getReceivingThreadState):
+                    continue
 
-                # if incoming bytes are waiting to be read from serial input
-                # buffer
-                if (connection.inWaiting() > 0):
-                    # read a '\n' terminated line
-                    line = connection.readline()
+            delay = self.readOnce(supervisor, connection)
+            if delay:
+                time.sleep(delay)
 
-                # if read thing is not empty
-                if line != "":
-                    self.logger.debug("Read line: %s" %(line))
-
-                    # create dict of this message
-                    messageDict = dict()
-                    messageDict["timestamp"] = unixMicros
-                    messageDict["message"] = line
-
-                    # add this message dict to the received queue
-                    # self._recievedQueue.put(messageDict)
-
-                    # AppendText is not thread safe!
-                    # self.txtSerialMonitor.AppendText(line)
-                    self.listen_event(data=messageDict)
-                    self.listen_json_event(data=line)
-
-                time.sleep(0.1)
+    ##
+    ## @brief      Read and hand over the data waiting at the USB port
+    ##
+    ## @param      self        The object
+    ## @param      supervisor  The supervisor of the connection
+    ## @param      connection  The serial connection
+    ##
+    ## @return     Time to sleep before the next read in seconds
+    ##
+    def readOnce(self, supervisor, connection):
+        if not connection.isOpen():
+            return 0
+
+        # for PySerial v3.0 or later, use property "in_waiting"
+        # instead of function inWaiting()
+        # https://stackoverflow.com/questions/17553543/pyserial-non-blocking-read-loop
+
+        # unixMicros = self.getCurrentTime()
+        unixMicros = self.getUnixMicrosTimestamp()
+        line = ""
+
+        if self.rawMode:
+            # binary data, take everything as is without splitting
+            # into lines or decoding
+            waiting = supervisor.inWaiting()
+            if waiting > 0:
+                data = supervisor.read(waiting)
+                self.byteCapture.append(data)
+
+                serialBridge = self.serialBridge
+                if serialBridge is not None:
+                    serialBridge.publishRaw(data)
+                return 0
+
+            return 0.01
+
+        # if incoming bytes are waiting to be read from serial input
+        # buffer
+        trace = None
+        waiting = supervisor.inWaiting()
+        if (waiting > 0):
+            # tag the arrival, None if tracing is disabled. The waiting
+            # bytes show how far the reading lags behind the device
+            trace = self.latencyTracer.begin(backlog=waiting)
+
+            # read a '\n' terminated line
+            line = supervisor.readline()
+            self.latencyTracer.mark(trace, "readline")
+
+        # if read thing is not empty
+        if line:
+            self.logger.debug("Read line: %s" %(line))
+
+            # hand over to the session log writer, never blocks
+            sessionLogger = self.sessionLogger
+            if sessionLogger is not None:
+                sessionLogger.logConsole(line)
+
+            serialBridge = self.serialBridge
+            if serialBridge is not None:
+                serialBridge.publishRaw(line)
+
+            # keep this message in the compact history, only its
+            # index is handed over to the UI
+            messageIndex = self.messageStore.append(line, unixMicros)
+
+            # AppendText is not thread safe!
+            # self.txtSerialMonitor.AppendText(line)
+            self.listen_event(data=messageIndex, trace=trace)
+            self.listen_json_event(data=line, trace=trace)
+
+            # read waiting lines right away, sleeping after each one lets
+            # the input buffer grow whenever lines arrive faster
+            return 0
+
+        return 0.01
 
     """
     def getReceiveQueue(self):
@@ -549,76 +862,327 @@ class frmSerialMonitor(wx.Frame):
     ## @return     Flat JSON structure
     ##
     def flatten_json(self, y):
-        out = {}
-
-        def flatten(x, name=''):
-            if type(x) is dict:
-                for a in x:
-                    flatten(x[a], name + a + '_')
-            elif type(x) is list:
-                i = 0
-                for a in x:
-                    flatten(a, name + str(i) + '_')
-                    i += 1
-            else:
-                out[name[:-1]] = x
-
-        flatten(y)
+        return flatJson.flatten_json(y)
 
-        return out
+    ##
+    ## @brief      Parse a received line as JSON
+    ##
+    ## @param      self  The object
+    ## @param      data  The received line
+    ##
+    ## @return     The parsed snapshot
+    ##
+    def decodeJson(self, data):
+        return json.loads(data)
 
     def getDebugItemDetail(self, key):
-        # index of this row
-        index = 0
+        if key not in self.debugInfoDict:
+            # not part of the shown snapshot
+            self.detailCache.invalidate()
+            self.item_detail_list.DeleteAllItems()
+            return
 
-        # remove all elements/rows/items in this list view
-        self.item_detail_list.DeleteAllItems()
+        # skip flattening and repainting if this subtree did not change
+        result, changedRows = self.detailCache.update(key, self.debugInfoDict[key])
 
-        # if this element contains a nested dict, make it flat before showing
-        if type(self.debugInfoDict[key]) is dict:
-            # flatten this element
-            flatElement = self.flatten_json(self.debugInfoDict[key])
+        if result == CACHE_HIT:
+            return
 
-            # add new rows for all elements of the flat dict
-            for el, val in sorted(flatElement.items()):
-                # add key (most left column of this list)
-                self.item_detail_list.InsertItem(index, el)
+        rows = self.detailCache.getRows()
 
-                # add value to this key (most right column of this list)
-                self.item_detail_list.SetItem(index, 1, str(flatElement[el]))
-                index += 1
-        else:
+        if result == CACHE_PARTIAL:
+            # same keys as before, update only the values which differ
+            for index in changedRows:
+                self.item_detail_list.SetItem(index, 1, rows[index][1])
+            return
+
+        # remove all elements/rows/items in this list view
+        self.item_detail_list.DeleteAllItems()
+
+        # add new rows for all elements of the (flattened) element
+        for index, (el, val) in enumerate(rows):
             # add key (most left column of this list)
-            self.item_detail_list.InsertItem(index, key)
+            self.item_detail_list.InsertItem(index, el)
 
             # add value to this key (most right column of this list)
-            self.item_detail_list.SetItem(index, 1, str(self.debugInfoDict[key]))
+            self.item_detail_list.SetItem(index, 1, val)
 
-    def getAllDebugItems(self, data):
+    def getAllDebugItems(self, data, trace=None):
         # self.logger.debug("Received: %s, of type %s" %(data, type(data)))
+        self.latencyTracer.mark(trace, "json_handoff")
 
         try:
-            self.debugInfoDict = json.loads(data)
-            # self.logger.debug(self.debugInfoDict)
+            snapshot = self.decodeJson(data)
+
+            self.latencyTracer.mark(trace, "json_decode")
+
+            # bare values like 42, true or "text" are no snapshots
+            if type(snapshot) is not dict:
+                return
+
+            self.latencyTracer.recordDeviceTime(trace, snapshot)
+
+            # continue with the snapshot sharing all unchanged subtrees with
+            # the previous one
+            snapshot = self.snapshotHistory.append(snapshot)
+
+            if self.sessionLogger is not None:
+                self.sessionLogger.logJson(snapshot)
 
-            # prettyJsonDump = json.dumps(self.debugInfoDict, indent=4)
+            # a failing sink must not stop the others or the UI update
+            if self.jsonExporter is not None:
+                try:
+                    self.jsonExporter.addSnapshot(snapshot)
+                except (ValueError, TypeError, OSError) as e:
+                    self.stopJsonExport(error=e)
+
+            if self.serialBridge is not None:
+                # forward the received text, no need to encode it again
+                try:
+                    self.serialBridge.publishJson(data)
+                except OSError as e:
+                    self.logger.warning("Error: %s" %(e))
+
+            if self.statePublisher is not None:
+                try:
+                    self.statePublisher.publish(snapshot)
+                except (ValueError, TypeError) as e:
+                    self.logger.warning("Error: %s" %(e))
+
+            matches = self.ruleEngine.evaluate(snapshot)
+            if matches:
+                self.handleRuleMatches(matches)
+            # self.logger.debug(snapshot)
+
+            # prettyJsonDump = json.dumps(snapshot, indent=4)
             # self.logger.debug(prettyJsonDump)
 
-            # remove all elements/rows/items in this list view
-            self.item_list.DeleteAllItems()
+            self.updateTimeline()
 
-            for ele, val in sorted(self.debugInfoDict.items(), reverse=True):
-                self.item_list.InsertItem(0, ele)
+            # keep showing the selected snapshot while scrubbing
+            if self.timelineLive:
+                self.debugInfoDict = snapshot
+                self.showDebugItems()
 
-            # do only if debugInfoDict has content
-            if self.debugInfoDict:
-                self.restorePreviousSelection()
+            self.latencyTracer.mark(trace, "list_paint")
         except Exception as e:
             pass
             # self.logger.warning(e)
 
+    ##
+    ## @brief      Fill the item list with the keys of debugInfoDict
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     None
+    ##
+    def showDebugItems(self):
+        # remove all elements/rows/items in this list view
+        self.item_list.DeleteAllItems()
+
+        for ele, val in sorted(self.debugInfoDict.items(), reverse=True):
+            self.item_list.InsertItem(0, ele)
+
+        self.highlightDebugItems()
+
+        # do only if debugInfoDict has content
+        if self.debugInfoDict:
+            self.restorePreviousSelection()
+
+    ##
+    ## @brief      Update range and position of the timeline slider
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     None
+    ##
+    def updateTimeline(self):
+        lastIndex = len(self.snapshotHistory) - 1
+
+        # indices shift by the number of dropped snapshots
+        dropped = self.snapshotHistory.droppedSnapshots - self.timelineDropped
+        self.timelineDropped = self.snapshotHistory.droppedSnapshots
+
+        if lastIndex < 1:
+            # nothing to scrub through yet
+            self.sldTimeline.SetRange(0, 1)
+            self.sldTimeline.SetValue(0)
+            self.sldTimeline.Disable()
+            return
+
+        self.sldTimeline.Enable()
+
+        if self.timelineLive:
+            self.sldTimeline.SetRange(0, lastIndex)
+            self.sldTimeline.SetValue(lastIndex)
+        else:
+            # keep the selected snapshot while the oldest ones are dropped
+            position = max(self.sldTimeline.GetValue() - dropped, 0)
+            self.sldTimeline.SetRange(0, lastIndex)
+            self.sldTimeline.SetValue(position)
+
+    ##
+    ## @brief      Show a snapshot of the history
+    ##
+    ## @param      self   The object
+    ## @param      index  The index of the snapshot
+    ##
+    ## @return     None
+    ##
+    def showSnapshot(self, index):
+        if not len(self.snapshotHistory):
+            return
+
+        # the slider may lag behind the history
+        if index >= len(self.snapshotHistory):
+            index = -1
+
+        timestamp, snapshot = self.snapshotHistory.get(index)
+        latestTimestamp = self.snapshotHistory.get(-1)[0]
+
+        self.debugInfoDict = snapshot
+        self.showDebugItems()
+
+        if self.timelineLive:
+            self.lblTimeline.SetLabel("Live")
+            return
+
+        changes = self.snapshotHistory.diff(index, -1)
+        self.lblTimeline.SetLabel("%s (%.1fs)"
+                                  %(datetime.datetime.fromtimestamp(timestamp).strftime("%H:%M:%S.%f")[:-3],
+                                    timestamp - latestTimestamp))
+        self.SetStatusText("%d fields differ from the latest snapshot" %(len(changes)))
+        self.Layout()
+
+    def OnTimelineScrolled(self, event):
+        index = self.sldTimeline.GetValue()
+        self.timelineLive = index >= len(self.snapshotHistory) - 1
+        self.btnLive.Enable(not self.timelineLive)
+
+        self.showSnapshot(index)
+
+    def OnTimelineLive(self, event):
+        self.timelineLive = True
+        self.btnLive.Disable()
+        self.updateTimeline()
+
+        self.showSnapshot(-1)
+
+    ##
+    ## @brief      Highlight the items of active highlight rules
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     None
+    ##
+    def highlightDebugItems(self):
+        highlightedKeys = self.ruleEngine.getHighlightedKeys()
+        if not highlightedKeys:
+            return
+
+        for idx in range(self.item_list.GetItemCount()):
+            if self.item_list.GetItemText(idx) in highlightedKeys:
+                self.item_list.SetItemBackgroundColour(idx, self.highlightColour)
+
+    ##
+    ## @brief      Run the actions of matching rules
+    ##
+    ## @param      self     The object
+    ## @param      matches  The list of RuleMatch
+    ##
+    ## @return     None
+    ##
+    def handleRuleMatches(self, matches):
+        for match in matches:
+            rule = match.rule
+            text = "Rule '%s' (%s): %s -> %s" %(rule.name, rule.expression, match.oldValue, match.newValue)
+
+            if "log" in rule.actions:
+                self.logger.warning(text)
+                self.SetStatusText(text)
+
+                if self.sessionLogger is not None:
+                    self.sessionLogger.logEvent({
+                        "rule": rule.name,
+                        "expression": rule.expression,
+                        "key": match.key,
+                        "old": match.oldValue,
+                        "new": match.newValue},
+                        timestamp=match.timestamp)
+
+            if "capture" in rule.actions:
+                self.saveCapture(name=rule.name)
+
+    ##
+    ## @brief      Save the latest lines of the console history
+    ##
+    ## The file is written by a background thread
+    ##
+    ## @param      self  The object
+    ## @param      name  The name of the capture, part of the file name
+    ##
+    ## @return     The path of the capture file
+    ##
+    def saveCapture(self, name):
+        fileName = "%s_%s.txt" %(datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f"),
+                                 "".join(c if c.isalnum() else "-" for c in name))
+        capturePath = os.path.join(self.captureDir, fileName)
+        start = len(self.messageStore) - self.captureLines
+        stop = len(self.messageStore)
+
+        def writeCapture():
+            if not os.path.isdir(self.captureDir):
+                os.makedirs(self.captureDir)
+
+            with open(capturePath, "wb") as captureFile:
+                for record in self.messageStore.iterRecords(start=start, stop=stop):
+                    captureFile.write(record.message)
+
+            self.logger.info("Saved capture %s" %(capturePath))
+
+        captureThread = threading.Thread(target=writeCapture, name="CaptureWriter")
+        captureThread.daemon = True
+        captureThread.start()
+
+        return capturePath
+
+    ##
+    ## @brief      Replace all rules by the rules of a JSON file
+    ##
+    ## @param      self  The object
+    ## @param      path  The path to the rules file
+    ##
+    ## @return     None
+    ##
+    def loadRules(self, path):
+        # the previous rules stay active if the file is invalid
+        try:
+            count = self.ruleEngine.loadRules(path)
+        except (IOError, ValueError) as e:
+            self.logger.warning("Error: %s" %(e))
+            self.SetStatusText("Failed to load rules: %s" %(e))
+            return
+
+        self.rulesPath = path
+        self.SetStatusText("Loaded %d rules from %s" %(count, path))
+
+    def OnLoadRules(self, event):
+        with wx.FileDialog(self,
+                           "Load rules",
+                           wildcard="JSON (*.json)|*.json",
+                           style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST) as fileDialog:
+            if fileDialog.ShowModal() == wx.ID_CANCEL:
+                return
+
+            self.loadRules(fileDialog.GetPath())
+
     def restorePreviousSelection(self):
-        idx = self.activeUserSelection["item"]
+        itemCount = self.item_list.GetItemCount()
+        if not itemCount:
+            return
+
+        # an older snapshot may have less items
+        idx = min(self.activeUserSelection["item"], itemCount - 1)
         self.item_list.Focus(idx)
         self.item_list.Select(idx)
 
@@ -657,15 +1221,23 @@ class frmSerialMonitor(wx.Frame):
         # pre-select the port of the port combo box
         self.cmbPorts.SetSelection(matchingIndex)
 
-    def listen_event(self, data):
-        wx.CallAfter(self.fillSerialConsole, data)
+    def listen_event(self, data, trace=None):
+        wx.CallAfter(self.fillSerialConsole, data, trace)
 
-    def listen_json_event(self, data):
-        wx.CallAfter(self.getAllDebugItems, data)
+    def listen_json_event(self, data, trace=None):
+        wx.CallAfter(self.getAllDebugItems, data, trace)
+
+    def fillSerialConsole(self, data, trace=None):
+        self.latencyTracer.mark(trace, "console_handoff")
+
+        try:
+            record = self.messageStore.getRecord(data)
+        except IndexError:
+            # already dropped from the history, UI is lagging far behind
+            return
 
-    def fillSerialConsole(self, data):
         # build message string
-        textMessage = "%s \t %s" %(data["timestamp"], data["message"])
+        textMessage = "%s \t %s" %(record.getTimeString(), record.getText())
 
         txtContent = self.txtSerialMonitor.GetValue()
 
@@ -681,6 +1253,304 @@ class frmSerialMonitor(wx.Frame):
         # to bottom position
         self.txtSerialMonitor.AppendText(textMessage)
 
+        self.latencyTracer.mark(trace, "console_paint")
+
+    ##
+    ## @brief      Start or stop writing the session log
+    ##
+    ## Segments and the index are named after the selected port
+    ##
+    ## @param      self   The object
+    ## @param      event  The event
+    ##
+    ## @return     None
+    ##
+    def OnToggleSessionLog(self, event):
+        if event.IsChecked():
+            portName = self.cmbPorts.GetStringSelection() or "device"
+            deviceName = os.path.basename(portName).replace(".", "-")
+
+            sessionLogger = SessionLogger(
+                logDir=self.sessionLogDir,
+                deviceName=deviceName)
+            sessionLogger.start()
+            self.sessionLogger = sessionLogger
+
+            self.SetStatusText("Session log: %s (%s)" %(self.sessionLogDir, deviceName))
+        elif self.sessionLogger is not None:
+            sessionLogger = self.sessionLogger
+            self.sessionLogger = None
+            sessionLogger.stop()
+
+            self.SetStatusText("Session log stopped")
+
+    ##
+    ## @brief      Start or stop exporting the received JSON snapshots
+    ##
+    ## The output format is chosen by the file extension
+    ##
+    ## @param      self   The object
+    ## @param      event  The event
+    ##
+    ## @return     None
+    ##
+    def OnToggleJsonExport(self, event):
+        if event.IsChecked():
+            wildcard = "CSV (*.csv)|*.csv|Parquet (*.parquet)|*.parquet|Arrow IPC (*.arrow)|*.arrow"
+            with wx.FileDialog(self,
+                               "Export JSON snapshots",
+                               wildcard=wildcard,
+                               style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT) as fileDialog:
+                if fileDialog.ShowModal() == wx.ID_CANCEL:
+                    self.GetMenuBar().Check(event.GetId(), False)
+                    return
+                outputPath = fileDialog.GetPath()
+
+            try:
+                self.jsonExporter = FlatJsonExporter(outputPath=outputPath)
+            except (RuntimeError, ValueError) as e:
+                self.logger.warning("Error: %s" %(e))
+                self.GetMenuBar().Check(event.GetId(), False)
+                wx.MessageBox(str(e), "Export JSON", wx.OK | wx.ICON_WARNING)
+                return
+
+            self.SetStatusText("Exporting JSON to %s" %(outputPath))
+        else:
+            self.stopJsonExport()
+
+    ##
+    ## @brief      Stop the JSON export
+    ##
+    ## @param      self   The object
+    ## @param      error  The error which stopped the export, None if
+    ##                    stopped by the user
+    ##
+    ## @return     None
+    ##
+    def stopJsonExport(self, error=None):
+        exporter = self.jsonExporter
+        if exporter is None:
+            return
+        self.jsonExporter = None
+        self.mnuJsonExport.Check(False)
+
+        try:
+            exporter.close()
+        except (ValueError, TypeError, OSError) as e:
+            error = error or e
+
+        if error is not None:
+            self.logger.warning("JSON export stopped: %s" %(error))
+            self.SetStatusText("JSON export stopped: %s" %(error))
+            return
+
+        self.SetStatusText("Exported %d rows to %d file(s)"
+                           %(exporter.exportedRows, len(exporter.parts)))
+
+    ##
+    ## @brief      Start or stop the TCP bridge
+    ##
+    ## @param      self   The object
+    ## @param      event  The event
+    ##
+    ## @return     None
+    ##
+    def OnToggleBridge(self, event):
+        if event.IsChecked():
+            serialBridge = SerialBridge(
+                host=self.bridgeHost,
+                rawPort=self.bridgeRawPort,
+                jsonPort=self.bridgeJsonPort,
+                websocketPort=self.bridgeWebsocketPort)
+            try:
+                serialBridge.start()
+            except OSError as e:
+                serialBridge.stop()
+                self.logger.warning("Error: %s" %(e))
+                self.GetMenuBar().Check(event.GetId(), False)
+                self.SetStatusText("TCP bridge not started: %s" %(e))
+                return
+            self.serialBridge = serialBridge
+
+            self.SetStatusText("TCP bridge on %s, raw: %d, JSON: %d, WebSocket: %d"
+                               %(self.bridgeHost,
+                                 self.bridgeRawPort,
+                                 self.bridgeJsonPort,
+                                 self.bridgeWebsocketPort))
+        elif self.serialBridge is not None:
+            serialBridge = self.serialBridge
+            self.serialBridge = None
+            serialBridge.stop()
+
+            self.SetStatusText("TCP bridge stopped")
+
+    ##
+    ## @brief      Open the hex inspector and switch to raw mode
+    ##
+    ## Received data is not split into lines or parsed as JSON while the
+    ## inspector is open
+    ##
+    ## @param      self   The object
+    ## @param      event  The event
+    ##
+    ## @return     None
+    ##
+    def OnOpenHexInspector(self, event):
+        if self.hexInspector is not None:
+            self.hexInspector.Raise()
+            return
+
+        self.hexInspector = frmHexInspector(
+            self,
+            capture=self.byteCapture,
+            onClose=self.OnHexInspectorClosed)
+        self.hexInspector.Show()
+
+        self.rawMode = True
+        self.SetStatusText("Raw mode, received data is shown in the hex inspector")
+
+    def OnHexInspectorClosed(self):
+        self.hexInspector = None
+        self.rawMode = False
+        self.SetStatusText("Line mode")
+
+    ##
+    ## @brief      Enable or disable latency tracing
+    ##
+    ## All recorded latencies are cleared when tracing is enabled
+    ##
+    ## @param      self   The object
+    ## @param      event  The event
+    ##
+    ## @return     None
+    ##
+    def OnToggleLatencyTracing(self, event):
+        if event.IsChecked():
+            self.latencyTracer.reset()
+        self.latencyTracer.enabled = event.IsChecked()
+
+        self.SetStatusText("Latency tracing %s" %("enabled" if self.latencyTracer.enabled else "disabled"))
+
+    def OnLatencyReport(self, event):
+        report = self.latencyTracer.getReport()
+        self.logger.info("Latency since arrival:\n%s" %(report))
+
+        wx.MessageBox(report, "Latency since arrival", wx.OK)
+
+    ##
+    ## @brief      Set the key of the timestamp sent by the device
+    ##
+    ## @param      self   The object
+    ## @param      event  The event
+    ##
+    ## @return     None
+    ##
+    def OnSetDeviceTimeKey(self, event):
+        # the scale is kept, it is set with --device-time-scale
+        with wx.TextEntryDialog(self,
+                                "Dotted path of the device timestamp, e.g. system.millis.\n"
+                                "One unit is %g s. Leave empty to disable." %(self.latencyTracer.deviceTimeScale),
+                                "Device time key",
+                                self.latencyTracer.deviceTimeKey or "") as dialog:
+            if dialog.ShowModal() != wx.ID_OK:
+                return
+
+            deviceTimeKey = dialog.GetValue().strip() or None
+
+        # offsets of another key are meaningless
+        self.latencyTracer.reset()
+        self.latencyTracer.deviceTimeKey = deviceTimeKey
+
+        self.SetStatusText("Device time key: %s" %(deviceTimeKey or "none"))
+
+    ##
+    ## @brief      Start a profiling run
+    ##
+    ## @param      self         The object
+    ## @param      mode         PROFILE_CPROFILE, PROFILE_SAMPLING or None to
+    ##                          time the stages only
+    ## @param      traceMemory  Trace allocations with tracemalloc
+    ## @param      duration     Stop after this many seconds, None to run
+    ##                          until stopped
+    ##
+    ## @return     None
+    ##
+    def startProfiling(self, mode, traceMemory, duration=None):
+        self.stageProfiler.start(mode=mode, traceMemory=traceMemory)
+
+        if duration is not None:
+            wx.CallLater(int(duration * 1000), self.stopProfiling)
+
+    ##
+    ## @brief      Stop the profiling run and save the results
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     The directory of the results, None if not running
+    ##
+    def stopProfiling(self):
+        if not self.stageProfiler.isRunning():
+            return None
+
+        try:
+            runDir = self.stageProfiler.stop()
+        except OSError as e:
+            self.logger.warning("Error: %s" %(e))
+            runDir = None
+
+        if self.mnuProfiling is not None:
+            self.mnuProfiling.Check(False)
+        if self.GetStatusBar() is not None:
+            self.SetStatusText("Profiling results saved to %s" %(runDir) if runDir else "Profiling results not saved")
+
+        return runDir
+
+    def OnToggleProfiling(self, event):
+        if not event.IsChecked():
+            self.stopProfiling()
+            return
+
+        self.startProfiling(mode=self.profileMode, traceMemory=self.traceAllocations)
+        self.SetStatusText("Profiling stages (%s%s)"
+                           %(self.profileMode, ", tracemalloc" if self.traceAllocations else ""))
+
+    def OnSelectProfiler(self, mode):
+        # used by the next run
+        self.profileMode = mode
+
+    def OnToggleTraceAllocations(self, event):
+        # used by the next run
+        self.traceAllocations = event.IsChecked()
+
+    ##
+    ## @brief      Start or stop publishing the state via shared memory
+    ##
+    ## @param      self   The object
+    ## @param      event  The event
+    ##
+    ## @return     None
+    ##
+    def OnToggleStatePublisher(self, event):
+        if event.IsChecked():
+            try:
+                self.statePublisher = SharedStatePublisher(name=self.sharedMemoryName)
+            except (RuntimeError, OSError) as e:
+                self.logger.warning("Error: %s" %(e))
+                self.GetMenuBar().Check(event.GetId(), False)
+                self.SetStatusText("Shared memory not available: %s" %(e))
+                return
+
+            # publish the current state right away
+            if self.debugInfoDict:
+                self.statePublisher.publish(self.snapshotHistory.get(-1)[1])
+
+            self.SetStatusText("Publishing state to shared memory '%s'" %(self.sharedMemoryName))
+        elif self.statePublisher is not None:
+            self.statePublisher.close()
+            self.statePublisher = None
+
+            self.SetStatusText("Shared memory publishing stopped")
+
     def OnPortChanged(self, event):
         if self.cmbPorts.GetCurrentSelection() < 0:
             # no port has been selected yet
@@ -692,19 +1562,19 @@ class frmSerialMonitor(wx.Frame):
             thisBaudrate = self.cmbBaudRate.GetString(self.cmbBaudRate.GetCurrentSelection())
             thisPort =  self.cmbPorts.GetString(self.cmbPorts.GetCurrentSelection())
 
-            self._conn = serial.Serial(
-                port=thisPort,
-                baudrate=int(thisBaudrate),
-                # parity=serial.PARITY_ODD,
-                # stopbits=serial.STOPBITS_TWO,
-                # bytesize=serial.SEVENBITS,
-                timeout=0.4,  # IMPORTANT, can be lower or higher
-                # inter_byte_timeout=0.1  # Alternative
-            )
-            self._conn.close()
+            # only configure the connection, it is opened by OnConnectTarget
+            self._conn = serial.Serial()
+            self._conn.port = thisPort
+            self._conn.baudrate = int(thisBaudrate)
+            self.latencyTracer.baudrate = self._conn.baudrate
+            # self._conn.parity = serial.PARITY_ODD
+            # self._conn.stopbits = serial.STOPBITS_TWO
+            # self._conn.bytesize = serial.SEVENBITS
+            self._conn.timeout = 0.4  # IMPORTANT, can be lower or higher
+            # self._conn.inter_byte_timeout = 0.1  # Alternative
 
             self.txtSerialMonitor.AppendText('** Baud Rate: %s \n' %(thisBaudrate))
-        except serial.serialutil.SerialException as e:
+        except (serial.serialutil.SerialException, ValueError) as e:
             self.txtSerialMonitor.AppendText('** An Error Occurred while Opening the Serial Port\n')
             self.logger.warning("Error: %s" %(e))
 
@@ -733,25 +1603,29 @@ class frmSerialMonitor(wx.Frame):
         if self._conn == None:
             return
 
-        if self._conn.isOpen():
-            # connection is open
+        if self._conn.isOpen() or self.getReceivingThreadState():
+            # connection is open or waiting to be restored
             self.logger.debug("Port is open, closing now")
 
-            self._conn.close()
-
             if self._receivingThread != None:
-                # stop any (may already running) receiving thread
+                # stop any (may already running) receiving thread before
+                # closing, otherwise it would try to reconnect
                 self.stopReceivingThread()
 
+            self._conn.close()
+
             self.btnConnect.SetLabel("Connect")
             self.logger.debug("Port is closed, ready to open")
         else:
             # connection not yet open
             self.logger.debug("Port is not open, opening now")
 
-            self._conn.open()
-
-            time.sleep(0.1)
+            try:
+                self._conn.open()
+            except serial.serialutil.SerialException as e:
+                self.txtSerialMonitor.AppendText('** An Error Occurred while Opening the Serial Port\n')
+                self.logger.warning("Error: %s" %(e))
+                return
 
             # start the receiving thread
             self.startReceivingThread()
@@ -759,6 +1633,35 @@ class frmSerialMonitor(wx.Frame):
             self.btnConnect.SetLabel("Disconnect")
             self.logger.debug("Port is open now, ready to receive")
 
+    ##
+    ## @brief      Called by the receiving thread if the connection is lost
+    ##
+    ## @param      self   The object
+    ## @param      error  The exception causing the loss
+    ##
+    ## @return     None
+    ##
+    def OnConnectionLost(self, error):
+        wx.CallAfter(self.txtSerialMonitor.AppendText,
+                     '\n** Connection lost, waiting for port to return\n')
+        wx.CallAfter(self.SetStatusText, "Connection lost: %s" %(error))
+
+    ##
+    ## @brief      Called by the receiving thread if the connection is restored
+    ##
+    ## @param      self    The object
+    ## @param      outage  Time without connection in seconds
+    ## @param      resume  Time between port reappearance and reopening
+    ##
+    ## @return     None
+    ##
+    def OnConnectionRestored(self, outage, resume):
+        wx.CallAfter(self.txtSerialMonitor.AppendText,
+                     '** Connection restored after %.3fs\n' %(outage))
+        wx.CallAfter(self.SetStatusText,
+                     "Reconnected in %.1fms after port reappeared (%d reconnects)"
+                     %(resume * 1000, self._supervisor.reconnectCount))
+
     def OnKey(self, event):
         key = event.GetKeyCode()
         if key == wx.WXK_RETURN:
@@ -779,17 +1682,17 @@ class frmSerialMonitor(wx.Frame):
                 self._conn.close()
                 exit()
             else:
-                strOut = self.txtSubmitString.GetValue() + b'\r\n'
+                strOut = self.txtSubmitString.GetValue() + '\r\n'
                 self.txtSerialMonitor.AppendText("\r\n>> " + self.txtSubmitString.GetValue())
                 self._conn.write(strOut.encode())
-                out = ''
+                out = b''
                 # let's wait one second before reading output (let's give device time to answer)
                 time.sleep(1)
                 while self._conn.inWaiting() > 0:
-                    out += self._conn.read(1)
+                    out += self._conn.read(self._conn.inWaiting())
 
-                if out != '':
-                    self.txtSerialMonitor.AppendText(out)
+                if out:
+                    self.txtSerialMonitor.AppendText(out.decode("utf-8", errors="replace"))
 
         self.txtSubmitString.Clear()
 
@@ -859,6 +1762,7 @@ class frmSerialMonitor(wx.Frame):
             self._conn.close()
             self.logger.debug("Closed serial connection")
 
+        logger.info("Detail cache: %s" %(self.detailCache.getStatistics()))
         logger.info("... closing app after %s" %self.getRuntime())
 
         self.Destroy()
@@ -866,8 +1770,23 @@ class frmSerialMonitor(wx.Frame):
 # end of class frmSerialMonitor
 
 class MyApp(wx.App):
+    def __init__(self, *args, **kwds):
+        # options of the command line, read in OnInit
+        self.args = kwds.pop("args", None)
+
+        wx.App.__init__(self, *args, **kwds)
+
     def OnInit(self):
-        self.frameSerialMonitor = frmSerialMonitor(None, wx.ID_ANY, "")
+        kwds = dict()
+        if self.args is not None:
+            kwds["profileMode"] = self.args.profile
+            kwds["traceAllocations"] = self.args.tracemalloc
+            kwds["profileDuration"] = self.args.profile_duration
+            kwds["profileDir"] = self.args.profile_dir
+            kwds["deviceTimeKey"] = self.args.device_time_key
+            kwds["deviceTimeScale"] = self.args.device_time_scale
+
+        self.frameSerialMonitor = frmSerialMonitor(None, wx.ID_ANY, "", **kwds)
         self.SetTopWindow(self.frameSerialMonitor)
         self.frameSerialMonitor.Show()
         return True
@@ -875,5 +1794,20 @@ class MyApp(wx.App):
 # end of class MyApp
 
 if __name__ == "__main__":
-    app = MyApp(0)
+    parser = argparse.ArgumentParser(description="EVSE Serial Debug Monitor")
+    parser.add_argument("--profile", choices=(PROFILE_CPROFILE, PROFILE_SAMPLING),
+                        help="Profile the processing stages from the start")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="Trace memory allocations from the start")
+    parser.add_argument("--profile-duration", type=float, metavar="SECONDS",
+                        help="Stop profiling after this time, default on exit")
+    parser.add_argument("--profile-dir", default="profiles",
+                        help="Directory of the profiling results")
+    parser.add_argument("--device-time-key", metavar="KEY",
+                        help="Dotted path of the device timestamp for latency tracing, e.g. system.millis")
+    parser.add_argument("--device-time-scale", type=float, default=0.001,
+                        help="Factor converting the device timestamp to seconds, default milliseconds")
+    args = parser.parse_args()
+
+    app = MyApp(0, args=args)
     app.MainLoop()
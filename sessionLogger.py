@@ -0,0 +1,413 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# ----------------------------------------------------------------------------
+#
+# ****************************************************************************
+# (c) Copyright by brainelectronics/ElectronicFuture, ALL RIGHTS RESERVED
+# ****************************************************************************
+#
+#  @author       brainelectronics (info@brainelectronics.de)
+#  @file         sessionLogger.py
+#  @date         October, 2026
+#  @version      0.1.0
+#  @brief        Rotating, compressed session logs of console and JSON data
+#
+#   used by serialDebugMonitor.py
+#
+#   Every batch of records is written as an independent gzip member or zstd
+#   frame, so a segment can be entered at any batch boundary. The index file
+#   lists one line per batch (first timestamp, segment, offset, length) which
+#   allows seeking to a point in time by decompressing only a single batch.
+# ----------------------------------------------------------------------------
+
+import bisect
+import datetime
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class SessionLogger(object):
+    # marker put into the queue to stop the writer thread
+    _STOP = object()
+
+    ##
+    ## @brief      Create a new session logger
+    ##
+    ## @param      self               The object
+    ## @param      logDir             Directory to store segments and index
+    ## @param      deviceName         Name used as prefix of all files
+    ## @param      maxSegmentBytes    Rotate segment after this size (bytes)
+    ## @param      maxSegmentSeconds  Rotate segment after this age (seconds)
+    ## @param      compression        "auto", "zstd", "gzip" or "none"
+    ## @param      batchSize          Max number of records per write
+    ## @param      flushInterval      Max time a record waits for its batch
+    ## @param      maxQueueSize       Records kept in memory before dropping
+    ##
+    def __init__(self,
+                 logDir,
+                 deviceName="device",
+                 maxSegmentBytes=64*1024*1024,
+                 maxSegmentSeconds=60*60,
+                 compression="auto",
+                 batchSize=2000,
+                 flushInterval=1.0,
+                 maxQueueSize=100*1000):
+        self.logger = logging.getLogger(__name__)
+
+        if compression == "auto":
+            compression = "zstd" if zstandard is not None else "gzip"
+        if compression == "zstd" and zstandard is None:
+            self.logger.warning("zstandard is not installed, using gzip")
+            compression = "gzip"
+        if compression not in ("zstd", "gzip", "none"):
+            raise ValueError("Unknown compression: %s" %(compression))
+
+        self.logDir = logDir
+        self.deviceName = deviceName
+        self.maxSegmentBytes = maxSegmentBytes
+        self.maxSegmentSeconds = maxSegmentSeconds
+        self.compression = compression
+        self.batchSize = batchSize
+        self.flushInterval = flushInterval
+
+        self.droppedRecords = 0
+        self.writtenRecords = 0
+
+        self._queue = queue.Queue(maxsize=maxQueueSize)
+        self._writerThread = None
+        self._segmentFile = None
+        self._segmentName = None
+        self._segmentStart = 0
+        self._indexFile = None
+
+        if self.compression == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=3)
+
+    ##
+    ## @brief      Gets the file extension of segments
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     The segment extension
+    ##
+    def getSegmentExtension(self):
+        return {"zstd": ".log.zst", "gzip": ".log.gz", "none": ".log"}[self.compression]
+
+    ##
+    ## @brief      Gets the path of the index file
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     The index path
+    ##
+    def getIndexPath(self):
+        return os.path.join(self.logDir, "%s.index" %(self.deviceName))
+
+    ##
+    ## @brief      Start the writer thread
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     None
+    ##
+    def start(self):
+        if self._writerThread is not None:
+            return
+
+        if not os.path.isdir(self.logDir):
+            os.makedirs(self.logDir)
+
+        self._indexFile = open(self.getIndexPath(), "a")
+
+        self._writerThread = threading.Thread(
+            target=self._run,
+            name="SessionLogWriter")
+        self._writerThread.daemon = True
+        self._writerThread.start()
+
+        self.logger.info("Session log started in %s (%s)" %(self.logDir, self.compression))
+
+    ##
+    ## @brief      Flush all pending records and stop the writer thread
+    ##
+    ## @param      self     The object
+    ## @param      timeout  Max time to wait for the writer (seconds)
+    ##
+    ## @return     None
+    ##
+    def stop(self, timeout=5):
+        if self._writerThread is None:
+            return
+
+        # the stop marker must not be dropped, block until there is room
+        self._queue.put(self._STOP)
+        self._writerThread.join(timeout)
+        self._writerThread = None
+
+        self.logger.info("Session log stopped, %d records written, %d dropped"
+                         %(self.writtenRecords, self.droppedRecords))
+
+    ##
+    ## @brief      Check if the writer thread is active
+    ##
+    ## @param      self  The object
+    ##
+    ## @retval     True     Records are accepted
+    ## @retval     False    Logger is not started
+    ##
+    def isRunning(self):
+        return self._writerThread is not None
+
+    ##
+    ## @brief      Log a line of the serial console
+    ##
+    ## Never blocks, the record is dropped if the writer can not keep up.
+    ##
+    ## @param      self       The object
+    ## @param      line       The line as received (bytes or str)
+    ## @param      timestamp  Unix timestamp in seconds, now if None
+    ##
+    ## @return     None
+    ##
+    def logConsole(self, line, timestamp=None):
+        self._enqueue("console", line, timestamp)
+
+    ##
+    ## @brief      Log a parsed JSON snapshot
+    ##
+    ## The object is serialized by the writer thread and must not be modified
+    ## after it has been handed over.
+    ##
+    ## @param      self       The object
+    ## @param      data       The parsed JSON content
+    ## @param      timestamp  Unix timestamp in seconds, now if None
+    ##
+    ## @return     None
+    ##
+    def logJson(self, data, timestamp=None):
+        self._enqueue("json", data, timestamp)
+
+    ##
+    ## @brief      Log an event, e.g. a matching trigger rule
+    ##
+    ## @param      self       The object
+    ## @param      data       JSON serializable description of the event
+    ## @param      timestamp  Unix timestamp in seconds, now if None
+    ##
+    ## @return     None
+    ##
+    def logEvent(self, data, timestamp=None):
+        self._enqueue("event", data, timestamp)
+
+    def _enqueue(self, kind, data, timestamp):
+        if timestamp is None:
+            timestamp = time.time()
+
+        try:
+            self._queue.put_nowait((timestamp, kind, data))
+        except queue.Full:
+            self.droppedRecords += 1
+
+    def _run(self):
+        stopping = False
+
+        while not stopping:
+            batch = list()
+
+            # wait for the first record of the next batch
+            record = self._queue.get()
+            if record is self._STOP:
+                break
+            batch.append(record)
+
+            # collect more records until the batch is full or too old
+            deadline = time.time() + self.flushInterval
+            while len(batch) < self.batchSize:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    record = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if record is self._STOP:
+                    stopping = True
+                    break
+                batch.append(record)
+
+            try:
+                self._writeBatch(batch)
+            except Exception as e:
+                self.logger.warning("Failed to write session log: %s" %(e))
+
+        self._closeSegment()
+        if self._indexFile is not None:
+            self._indexFile.close()
+            self._indexFile = None
+
+    def _encodeRecord(self, record):
+        timestamp, kind, data = record
+        if isinstance(data, bytes):
+            data = data.decode("utf-8", errors="replace")
+
+        return json.dumps({"t": timestamp, "k": kind, "d": data}) + "\n"
+
+    def _compress(self, raw):
+        if self.compression == "zstd":
+            return self._compressor.compress(raw)
+        elif self.compression == "gzip":
+            return gzip.compress(raw, compresslevel=6)
+        return raw
+
+    def _writeBatch(self, batch):
+        firstTimestamp = batch[0][0]
+
+        if self._needsRotation(firstTimestamp):
+            self._closeSegment()
+            self._openSegment(firstTimestamp)
+
+        raw = "".join(self._encodeRecord(r) for r in batch).encode("utf-8")
+        block = self._compress(raw)
+
+        offset = self._segmentFile.tell()
+        self._segmentFile.write(block)
+        self._segmentFile.flush()
+
+        # records of the reading and the UI thread are stamped separately
+        # and are not strictly ordered, index the earliest one
+        indexEntry = {
+            "t": min(record[0] for record in batch),
+            "segment": self._segmentName,
+            "offset": offset,
+            "length": len(block),
+            "records": len(batch)
+        }
+        self._indexFile.write(json.dumps(indexEntry) + "\n")
+        self._indexFile.flush()
+
+        self.writtenRecords += len(batch)
+
+    def _needsRotation(self, timestamp):
+        if self._segmentFile is None:
+            return True
+        if self._segmentFile.tell() >= self.maxSegmentBytes:
+            return True
+        if timestamp - self._segmentStart >= self.maxSegmentSeconds:
+            return True
+        return False
+
+    def _openSegment(self, timestamp):
+        startTime = datetime.datetime.fromtimestamp(timestamp)
+        self._segmentName = "%s_%s_%06d%s" %(self.deviceName,
+                                             startTime.strftime("%Y%m%d-%H%M%S"),
+                                             startTime.microsecond,
+                                             self.getSegmentExtension())
+        self._segmentStart = timestamp
+        self._segmentFile = open(os.path.join(self.logDir, self._segmentName), "ab")
+        self.logger.debug("Opened session log segment %s" %(self._segmentName))
+
+    def _closeSegment(self):
+        if self._segmentFile is not None:
+            self._segmentFile.close()
+            self._segmentFile = None
+            self.logger.debug("Closed session log segment %s" %(self._segmentName))
+
+# end of class SessionLogger
+
+
+class SessionLogReader(object):
+    ##
+    ## @brief      Read back the logs written by a SessionLogger
+    ##
+    ## @param      self        The object
+    ## @param      logDir      Directory containing segments and index
+    ## @param      deviceName  Prefix of all files
+    ##
+    def __init__(self, logDir, deviceName="device"):
+        self.logDir = logDir
+        self.deviceName = deviceName
+        self._index = list()
+        self._indexTimes = list()
+
+        self.reloadIndex()
+
+    ##
+    ## @brief      Read the index file again, e.g. while still being written
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     None
+    ##
+    def reloadIndex(self):
+        self._index = list()
+        indexPath = os.path.join(self.logDir, "%s.index" %(self.deviceName))
+
+        with open(indexPath, "r") as indexFile:
+            for line in indexFile:
+                try:
+                    self._index.append(json.loads(line))
+                except ValueError:
+                    # last line may be incomplete while being written
+                    pass
+
+        self._indexTimes = [entry["t"] for entry in self._index]
+
+    ##
+    ## @brief      Iterate over the logged records
+    ##
+    ## Only the batches covering the requested time window are decompressed,
+    ## one at a time.
+    ##
+    ## @param      self   The object
+    ## @param      since  Unix timestamp of first record, start of log if None
+    ## @param      until  Unix timestamp of last record, end of log if None
+    ## @param      kind   Only records of this kind ("console", "json", "event")
+    ##
+    ## @return     Generator of (timestamp, kind, data) tuples
+    ##
+    def records(self, since=None, until=None, kind=None):
+        startIdx = 0
+        if since is not None:
+            # last batch starting at or before 'since' may contain it
+            startIdx = max(bisect.bisect_right(self._indexTimes, since) - 1, 0)
+
+        for entry in self._index[startIdx:]:
+            if until is not None and entry["t"] > until:
+                break
+
+            for line in self._readBlock(entry).splitlines():
+                record = json.loads(line)
+                if since is not None and record["t"] < since:
+                    continue
+                if until is not None and record["t"] > until:
+                    # a later record of this batch may still be in range
+                    continue
+                if kind is not None and record["k"] != kind:
+                    continue
+
+                yield record["t"], record["k"], record["d"]
+
+    def _readBlock(self, entry):
+        with open(os.path.join(self.logDir, entry["segment"]), "rb") as segmentFile:
+            segmentFile.seek(entry["offset"])
+            block = segmentFile.read(entry["length"])
+
+        if entry["segment"].endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read %s" %(entry["segment"]))
+            return zstandard.ZstdDecompressor().decompress(block).decode("utf-8")
+        elif entry["segment"].endswith(".gz"):
+            return gzip.decompress(block).decode("utf-8")
+        return block.decode("utf-8")
+
+# end of class SessionLogReader
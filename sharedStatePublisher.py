@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# ----------------------------------------------------------------------------
+#
+# ****************************************************************************
+# (c) Copyright by brainelectronics/ElectronicFuture, ALL RIGHTS RESERVED
+# ****************************************************************************
+#
+#  @author       brainelectronics (info@brainelectronics.de)
+#  @file         sharedStatePublisher.py
+#  @date         October, 2026
+#  @version      0.1.0
+#  @brief        Publish the latest device state via shared memory
+#
+#   usage: python3 sharedStatePublisher.py [--name serialDebugMonitor]
+#          prints every update published by a running monitor
+#
+#   used by serialDebugMonitor.py and local test scripts
+#
+#   from sharedStatePublisher import SharedStateReader
+#   reader = SharedStateReader()
+#   sequence, state = reader.read()
+#
+#   Layout of the segment (little endian):
+#       0   4 bytes   magic "SDMS"
+#       4   uint32    layout version
+#       8   uint64    sequence, odd while the writer is updating
+#       16  uint64    payload length
+#       24  uint64    payload capacity
+#       32  ...       payload, flattened snapshot as UTF-8 JSON
+#
+#   Seqlock: the single writer makes the sequence odd, writes the payload
+#   and its length and makes the sequence even again. A reader copies the
+#   payload and retries if the sequence was odd or changed meanwhile.
+#   Readers never block the writer and take no locks. Python offers no
+#   memory barriers, the stores are issued in program order which strongly
+#   ordered CPUs like x86 preserve.
+# ----------------------------------------------------------------------------
+
+import argparse
+import json
+import logging
+import struct
+import time
+
+try:
+    from multiprocessing import shared_memory
+    from multiprocessing import resource_tracker
+except ImportError:
+    # Python < 3.8
+    shared_memory = None
+
+import flatJson
+
+DEFAULT_NAME = "serialDebugMonitor"
+
+MAGIC = b"SDMS"
+LAYOUT_VERSION = 1
+
+HEADER = struct.Struct("<4sIQQQ")
+SEQUENCE = struct.Struct("<Q")
+LENGTH = struct.Struct("<Q")
+SEQUENCE_OFFSET = 8
+LENGTH_OFFSET = 16
+PAYLOAD_OFFSET = 32
+
+
+class SharedStatePublisher(object):
+    ##
+    ## @brief      Create a shared memory segment to publish the state
+    ##
+    ## @param      self      The object
+    ## @param      name      The name of the segment
+    ## @param      capacity  Max size of a published snapshot in bytes
+    ##
+    def __init__(self, name=DEFAULT_NAME, capacity=1024*1024):
+        if shared_memory is None:
+            raise RuntimeError("multiprocessing.shared_memory requires Python 3.8")
+
+        self.logger = logging.getLogger(__name__)
+
+        self.name = name
+        self.capacity = capacity
+        self.sequence = 0
+        self.skippedSnapshots = 0
+
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=PAYLOAD_OFFSET + capacity)
+        self._buffer = self._shm.buf
+        HEADER.pack_into(self._buffer, 0, MAGIC, LAYOUT_VERSION, 0, 0, capacity)
+
+        self.logger.info("Publishing state to shared memory '%s'" %(name))
+
+    ##
+    ## @brief      Publish a snapshot, flattened like in the detail list
+    ##
+    ## @param      self      The object
+    ## @param      snapshot  The parsed JSON snapshot
+    ##
+    ## @return     The new sequence number, None if too large
+    ##
+    def publish(self, snapshot):
+        if isinstance(snapshot, (dict, list)):
+            snapshot = flatJson.flatten_json(snapshot)
+
+        return self.publishRaw(json.dumps(snapshot).encode("utf-8"))
+
+    ##
+    ## @brief      Publish an already encoded payload
+    ##
+    ## @param      self     The object
+    ## @param      payload  The payload as bytes
+    ##
+    ## @return     The new sequence number, None if too large
+    ##
+    def publishRaw(self, payload):
+        length = len(payload)
+        if length > self.capacity:
+            self.skippedSnapshots += 1
+            self.logger.warning("Snapshot of %d bytes exceeds shared memory capacity" %(length))
+            return None
+
+        buffer = self._buffer
+
+        # odd sequence, readers retry until the update is complete
+        SEQUENCE.pack_into(buffer, SEQUENCE_OFFSET, self.sequence + 1)
+        buffer[PAYLOAD_OFFSET:PAYLOAD_OFFSET + length] = payload
+        LENGTH.pack_into(buffer, LENGTH_OFFSET, length)
+        self.sequence += 2
+        SEQUENCE.pack_into(buffer, SEQUENCE_OFFSET, self.sequence)
+
+        return self.sequence
+
+    ##
+    ## @brief      Close and remove the segment
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     None
+    ##
+    def close(self):
+        if self._shm is None:
+            return
+
+        self._buffer.release()
+        self._buffer = None
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+# end of class SharedStatePublisher
+
+
+class SharedStateReader(object):
+    ##
+    ## @brief      Attach to the segment of a running publisher
+    ##
+    ## @param      self  The object
+    ## @param      name  The name of the segment
+    ##
+    def __init__(self, name=DEFAULT_NAME):
+        if shared_memory is None:
+            raise RuntimeError("multiprocessing.shared_memory requires Python 3.8")
+
+        try:
+            # do not remove the segment of the publisher on exit
+            self._shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13 registers attached segments as well
+            self._shm = shared_memory.SharedMemory(name=name)
+            try:
+                resource_tracker.unregister(self._shm._name, "shared_memory")
+            except Exception:
+                pass
+
+        self._buffer = self._shm.buf
+        magic, version, sequence, length, capacity = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            self.close()
+            raise ValueError("Shared memory '%s' has an unknown layout" %(name))
+
+    ##
+    ## @brief      Gets the current sequence number without reading the state
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     The sequence, odd while an update is in progress
+    ##
+    def getSequence(self):
+        return SEQUENCE.unpack_from(self._buffer, SEQUENCE_OFFSET)[0]
+
+    ##
+    ## @brief      Read a consistent copy of the payload
+    ##
+    ## @param      self        The object
+    ## @param      maxRetries  Give up after this many torn reads
+    ##
+    ## @return     Tuple of sequence and payload bytes, RuntimeError if the
+    ##             writer kept updating
+    ##
+    def readRaw(self, maxRetries=10000):
+        buffer = self._buffer
+
+        for attempt in range(maxRetries):
+            before = SEQUENCE.unpack_from(buffer, SEQUENCE_OFFSET)[0]
+            if before & 1:
+                continue
+
+            length = LENGTH.unpack_from(buffer, LENGTH_OFFSET)[0]
+            payload = bytes(buffer[PAYLOAD_OFFSET:PAYLOAD_OFFSET + length])
+
+            after = SEQUENCE.unpack_from(buffer, SEQUENCE_OFFSET)[0]
+            if before == after:
+                return before, payload
+
+        raise RuntimeError("No consistent state after %d attempts" %(maxRetries))
+
+    ##
+    ## @brief      Read the current state
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     Tuple of sequence and flattened state dict, the state is
+    ##             None if nothing has been published yet
+    ##
+    def read(self):
+        sequence, payload = self.readRaw()
+        if sequence == 0:
+            return sequence, None
+
+        return sequence, json.loads(payload)
+
+    ##
+    ## @brief      Wait for a state newer than a known sequence
+    ##
+    ## @param      self          The object
+    ## @param      lastSequence  The last sequence seen by the caller
+    ## @param      timeout       Max time to wait in seconds, None for ever
+    ## @param      pollInterval  Time between two checks in seconds
+    ##
+    ## @return     Tuple of sequence and state, None if timed out
+    ##
+    def waitForUpdate(self, lastSequence, timeout=None, pollInterval=0.0001):
+        deadline = None if timeout is None else time.time() + timeout
+
+        while True:
+            sequence = self.getSequence()
+            if sequence != lastSequence and not sequence & 1:
+                return self.read()
+            if deadline is not None and time.time() > deadline:
+                return None
+            time.sleep(pollInterval)
+
+    ##
+    ## @brief      Detach from the segment
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     None
+    ##
+    def close(self):
+        if self._shm is None:
+            return
+
+        self._buffer.release()
+        self._buffer = None
+        self._shm.close()
+        self._shm = None
+
+# end of class SharedStateReader
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the state published by the monitor")
+    parser.add_argument("--name", default=DEFAULT_NAME, help="Name of the shared memory segment")
+    parser.add_argument("--benchmark", type=int, default=0, metavar="N",
+                        help="Measure the time of N reads instead of printing updates")
+    args = parser.parse_args()
+
+    reader = SharedStateReader(name=args.name)
+
+    try:
+        if args.benchmark:
+            startTime = time.perf_counter()
+            for i in range(args.benchmark):
+                reader.read()
+            duration = time.perf_counter() - startTime
+            print("%.2f us per read" %(duration / args.benchmark * 1e6))
+            return
+
+        sequence = 0
+        while True:
+            update = reader.waitForUpdate(sequence, timeout=1)
+            if update is None:
+                continue
+            sequence, state = update
+            print("%d: %s" %(sequence, json.dumps(state)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+if __name__ == '__main__':
+    main()
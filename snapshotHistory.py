@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# ----------------------------------------------------------------------------
+#
+# ****************************************************************************
+# (c) Copyright by brainelectronics/ElectronicFuture, ALL RIGHTS RESERVED
+# ****************************************************************************
+#
+#  @author       brainelectronics (info@brainelectronics.de)
+#  @file         snapshotHistory.py
+#  @date         October, 2026
+#  @version      0.1.0
+#  @brief        Time-travel history of JSON snapshots with structural sharing
+#
+#   used by serialDebugMonitor.py
+#
+#   A new snapshot reuses every subtree which is equal to the one of the
+#   previous snapshot, so only changed subtrees take up new memory. As
+#   unchanged subtrees are the very same objects, a diff between any two
+#   snapshots skips them by an identity check.
+#
+#   Snapshots handed out by the history are shared and must not be modified.
+# ----------------------------------------------------------------------------
+
+import bisect
+import collections
+import time
+
+# marker of a missing key or list element
+MISSING = object()
+
+
+##
+## @brief      Reuse all subtrees of old which are equal in new
+##
+## @param      new   The new (nested) value
+## @param      old   The previous (nested) value
+##
+## @return     Tuple of the shared value and the number of new nodes
+##
+def shareStructure(new, old):
+    if new is old:
+        return old, 0
+
+    if type(new) is dict and type(old) is dict:
+        shared = dict()
+        created = 0
+        same = len(new) == len(old)
+
+        for key, value in new.items():
+            oldValue = old.get(key, MISSING)
+            if oldValue is MISSING:
+                shared[key] = value
+                created += 1
+                same = False
+                continue
+
+            sharedValue, count = shareStructure(value, oldValue)
+            shared[key] = sharedValue
+            created += count
+            if sharedValue is not oldValue:
+                same = False
+
+        if same:
+            return old, 0
+        return shared, created + 1
+
+    if type(new) is list and type(old) is list:
+        shared = list()
+        created = 0
+        same = len(new) == len(old)
+
+        for idx, value in enumerate(new):
+            if idx >= len(old):
+                shared.append(value)
+                created += 1
+                continue
+
+            sharedValue, count = shareStructure(value, old[idx])
+            shared.append(sharedValue)
+            created += count
+            if sharedValue is not old[idx]:
+                same = False
+
+        if same:
+            return old, 0
+        return shared, created + 1
+
+    # compare the type as well, 1 == 1.0 == True
+    if type(new) is type(old) and new == old:
+        return old, 0
+
+    return new, 1
+
+
+##
+## @brief      Compute the differences between two (nested) values
+##
+## Keys of the result are flattened like flatten_json does it
+##
+## @param      old   The old value
+## @param      new   The new value
+## @param      name  The flattened name of this value
+## @param      out   List the differences are appended to
+##
+## @return     List of (flat key, old value, new value), MISSING marks added
+##             or removed values
+##
+def diffStructure(old, new, name="", out=None):
+    if out is None:
+        out = list()
+
+    if old is new:
+        # shared subtree, nothing changed below
+        return out
+
+    if type(old) is dict and type(new) is dict:
+        for key, value in new.items():
+            diffStructure(old.get(key, MISSING), value, name + key + "_", out)
+        for key, value in old.items():
+            if key not in new:
+                diffStructure(value, MISSING, name + key + "_", out)
+    elif type(old) is list and type(new) is list:
+        for idx in range(max(len(old), len(new))):
+            diffStructure(old[idx] if idx < len(old) else MISSING,
+                          new[idx] if idx < len(new) else MISSING,
+                          name + str(idx) + "_",
+                          out)
+    elif type(old) is not type(new) or old != new:
+        out.append((name[:-1], old, new))
+
+    return out
+
+
+class SnapshotHistory(object):
+    ##
+    ## @brief      Create a new snapshot history
+    ##
+    ## @param      self          The object
+    ## @param      maxSnapshots  Number of snapshots to keep
+    ##
+    def __init__(self, maxSnapshots=10*1000):
+        self.maxSnapshots = maxSnapshots
+
+        self._timestamps = collections.deque(maxlen=maxSnapshots)
+        self._snapshots = collections.deque(maxlen=maxSnapshots)
+        # number of new nodes of each snapshot, the rest is shared
+        self._createdNodes = collections.deque(maxlen=maxSnapshots)
+
+        # number of oldest snapshots dropped so far, shifts all indices
+        self.droppedSnapshots = 0
+
+    def __len__(self):
+        return len(self._snapshots)
+
+    ##
+    ## @brief      Add a new snapshot
+    ##
+    ## @param      self       The object
+    ## @param      snapshot   The parsed JSON snapshot
+    ## @param      timestamp  Unix timestamp in seconds, now if None
+    ##
+    ## @return     The snapshot sharing all unchanged subtrees, use this one
+    ##             instead of the given one
+    ##
+    def append(self, snapshot, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+
+        if self._snapshots:
+            snapshot, created = shareStructure(snapshot, self._snapshots[-1])
+        else:
+            created = 1
+
+        if len(self._snapshots) == self.maxSnapshots:
+            self.droppedSnapshots += 1
+
+        self._timestamps.append(timestamp)
+        self._snapshots.append(snapshot)
+        self._createdNodes.append(created)
+
+        return snapshot
+
+    ##
+    ## @brief      Remove all snapshots
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     None
+    ##
+    def clear(self):
+        self._timestamps.clear()
+        self._snapshots.clear()
+        self._createdNodes.clear()
+
+    ##
+    ## @brief      Gets a snapshot
+    ##
+    ## @param      self   The object
+    ## @param      index  The index, 0 is the oldest, -1 the latest
+    ##
+    ## @return     Tuple of timestamp and snapshot
+    ##
+    def get(self, index):
+        return self._timestamps[index], self._snapshots[index]
+
+    ##
+    ## @brief      Gets the index of the snapshot valid at a point in time
+    ##
+    ## @param      self       The object
+    ## @param      timestamp  Unix timestamp in seconds
+    ##
+    ## @return     Index of the latest snapshot not newer than timestamp, 0
+    ##             if all are newer
+    ##
+    def indexAt(self, timestamp):
+        return max(bisect.bisect_right(self._timestamps, timestamp) - 1, 0)
+
+    ##
+    ## @brief      Compute the differences between two snapshots
+    ##
+    ## @param      self      The object
+    ## @param      oldIndex  The index of the older snapshot
+    ## @param      newIndex  The index of the newer snapshot
+    ##
+    ## @return     List of (flat key, old value, new value)
+    ##
+    def diff(self, oldIndex, newIndex):
+        return diffStructure(self._snapshots[oldIndex], self._snapshots[newIndex])
+
+    ##
+    ## @brief      Gets the number of nodes created by all kept snapshots
+    ##
+    ## A full copy per snapshot would create the number of nodes of the
+    ## document for every snapshot
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     The created nodes
+    ##
+    def getCreatedNodes(self):
+        return sum(self._createdNodes)
+
+# end of class SnapshotHistory
@@ -0,0 +1,485 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# ----------------------------------------------------------------------------
+#
+# ****************************************************************************
+# (c) Copyright by brainelectronics/ElectronicFuture, ALL RIGHTS RESERVED
+# ****************************************************************************
+#
+#  @author       brainelectronics (info@brainelectronics.de)
+#  @file         stageProfiler.py
+#  @date         October, 2026
+#  @version      0.1.0
+#  @brief        Profile and trace allocations of named processing stages
+#
+#   usage: python3 stageProfiler.py RUN_DIR [OTHER_RUN_DIR]
+#          prints the stage summary of a run or compares two runs
+#
+#   used by serialDebugMonitor.py
+#
+#   A stage is a method or function attribute of an object. While a run is
+#   active the attribute is replaced by a wrapper on the instance, which
+#   measures the calls and switches to the cProfile profiler of the stage.
+#   Stopping the run restores the attribute, so there is no overhead at all
+#   while no run is active.
+#
+#   Each thread gets its own cProfile profiler per stage. Since Python 3.12
+#   only one profiler can be active in the whole process, calls of a stage
+#   while another thread is being profiled are then timed but not profiled
+#   and counted as overlapping. The sampling profiler looks at all threads
+#   and attributes each sample to the innermost stage the thread is in.
+#
+#   Each run writes to its own directory:
+#       stages.json / stages.txt    calls and time of all stages
+#       <stage>.prof / <stage>.txt  cProfile stats, load with pstats
+#       samples.folded              sampled stacks, e.g. for flamegraph.pl
+#       tracemalloc.txt             allocations grown during the run
+#       tracemalloc.snapshot        load with tracemalloc.Snapshot.load
+# ----------------------------------------------------------------------------
+
+import argparse
+import collections
+import cProfile
+import datetime
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+# profiler of a run
+PROFILE_CPROFILE = "cprofile"
+PROFILE_SAMPLING = "sampling"
+PROFILE_MODES = (PROFILE_CPROFILE, PROFILE_SAMPLING)
+
+# marker of an attribute not set on the instance itself
+MISSING = object()
+
+
+class StageStatistics(object):
+    __slots__ = ("calls", "total", "maximum", "allocated", "overlapping", "samples")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        # net change of traced memory, approximate if threads overlap
+        self.allocated = 0
+        self.overlapping = 0
+        self.samples = 0
+
+    def toDict(self):
+        stats = dict()
+        stats["calls"] = self.calls
+        stats["total"] = self.total
+        stats["mean"] = self.total / self.calls if self.calls else None
+        stats["maximum"] = self.maximum
+        stats["allocated"] = self.allocated
+        stats["overlapping"] = self.overlapping
+        stats["samples"] = self.samples
+
+        return stats
+
+# end of class StageStatistics
+
+
+class StageProfiler(object):
+    ##
+    ## @brief      Create a new stage profiler, no run is active
+    ##
+    ## @param      self       The object
+    ## @param      outputDir  The directory of the run directories
+    ##
+    def __init__(self, outputDir="profiles"):
+        self.logger = logging.getLogger(__name__)
+
+        self.outputDir = outputDir
+
+        # stage name and (owner, attribute) of all instrumented stages
+        self._stages = collections.OrderedDict()
+
+        self._running = False
+        self._mode = None
+        self._traceMemory = False
+        self._startedTracemalloc = False
+        self._startTime = None
+        self._startWallTime = None
+        self._startSnapshot = None
+        self._originals = list()
+
+        self._statistics = None
+        self._profiles = None
+        # Python 3.12 and later allow a single active profiler per process
+        self._exclusiveProfiler = sys.version_info >= (3, 12)
+        self._profileLock = threading.Lock()
+
+        # stack of active (stage, profile) by thread id, read by the sampler
+        self._stacks = dict()
+
+        self.sampleInterval = 0.005
+        self._samples = None
+        self._sampler = None
+        self._stopSampling = threading.Event()
+
+    ##
+    ## @brief      Add a stage
+    ##
+    ## @param      self       The object
+    ## @param      stage      The name of the stage
+    ## @param      owner      The object the callable is an attribute of
+    ## @param      attribute  The name of the attribute
+    ##
+    ## @return     None
+    ##
+    def instrument(self, stage, owner, attribute):
+        if self._running:
+            raise RuntimeError("Stages can not be added during a run")
+
+        self._stages[stage] = (owner, attribute)
+
+    def getStages(self):
+        return list(self._stages.keys())
+
+    def isRunning(self):
+        return self._running
+
+    ##
+    ## @brief      Start a run
+    ##
+    ## @param      self         The object
+    ## @param      mode         PROFILE_CPROFILE, PROFILE_SAMPLING or None to
+    ##                          time the stages only
+    ## @param      traceMemory  Trace allocations with tracemalloc
+    ##
+    ## @return     None
+    ##
+    def start(self, mode=PROFILE_CPROFILE, traceMemory=False):
+        if self._running:
+            raise RuntimeError("Profiling is already running")
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError("Unknown profiler '%s', use one of %s" %(mode, ", ".join(PROFILE_MODES)))
+
+        self._mode = mode
+        self._traceMemory = traceMemory
+        self._statistics = dict((stage, StageStatistics()) for stage in self._stages)
+        self._stacks = dict()
+
+        if mode == PROFILE_CPROFILE:
+            # profilers by stage and thread id, created on first use
+            self._profiles = dict()
+        else:
+            self._profiles = None
+
+        if traceMemory:
+            self._startedTracemalloc = not tracemalloc.is_tracing()
+            if self._startedTracemalloc:
+                tracemalloc.start(16)
+            self._startSnapshot = tracemalloc.take_snapshot()
+
+        if mode == PROFILE_SAMPLING:
+            self._samples = collections.Counter()
+            self._stopSampling.clear()
+            self._sampler = threading.Thread(target=self._sample, name="SamplingProfiler", daemon=True)
+            self._sampler.start()
+
+        self._startTime = time.perf_counter()
+        self._startWallTime = datetime.datetime.now()
+
+        # install the wrappers last, everything they use is ready now
+        self._originals = list()
+        for stage, (owner, attribute) in self._stages.items():
+            self._originals.append((owner, attribute, vars(owner).get(attribute, MISSING)))
+            setattr(owner, attribute, self._wrap(stage, getattr(owner, attribute)))
+
+        self._running = True
+
+        self.logger.info("Profiling %s (%s%s)"
+                         %(", ".join(self._stages),
+                           mode or "timing only",
+                           ", tracemalloc" if traceMemory else ""))
+
+    ##
+    ## @brief      Stop the run and save the results
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     The directory of this run
+    ##
+    def stop(self):
+        if not self._running:
+            raise RuntimeError("Profiling is not running")
+
+        for owner, attribute, original in self._originals:
+            if original is MISSING:
+                delattr(owner, attribute)
+            else:
+                setattr(owner, attribute, original)
+        self._originals = list()
+        self._running = False
+
+        # let calls of other threads leave their stage
+        deadline = time.perf_counter() + 1
+        while any(self._stacks.values()) and time.perf_counter() < deadline:
+            time.sleep(0.001)
+
+        duration = time.perf_counter() - self._startTime
+
+        if self._sampler is not None:
+            self._stopSampling.set()
+            self._sampler.join()
+            self._sampler = None
+
+        endSnapshot = None
+        if self._traceMemory:
+            endSnapshot = tracemalloc.take_snapshot()
+            if self._startedTracemalloc:
+                tracemalloc.stop()
+
+        runDir = self._createRunDir()
+        self._saveStages(runDir, duration)
+        if self._profiles is not None:
+            self._saveProfiles(runDir)
+        if self._samples is not None:
+            self._saveSamples(runDir)
+        if endSnapshot is not None:
+            self._saveAllocations(runDir, endSnapshot)
+
+        self._profiles = None
+        self._samples = None
+        self._startSnapshot = None
+
+        self.logger.info("Profiling results saved to %s" %(runDir))
+
+        return runDir
+
+    def _wrap(self, stage, function):
+        def stageWrapper(*args, **kwargs):
+            return self._call(stage, function, args, kwargs)
+
+        stageWrapper.__wrapped__ = function
+        return stageWrapper
+
+    def _call(self, stage, function, args, kwargs):
+        ident = threading.get_ident()
+        stack = self._stacks.setdefault(ident, list())
+        statistics = self._statistics[stage]
+        profiles = self._profiles
+
+        # profiler of the enclosing stage of this thread, None if it is
+        # not profiled
+        outerProfile = stack[-1][1] if stack else None
+
+        # an exclusive profiler is kept until the thread leaves its
+        # outermost stage
+        profile = None
+        acquired = False
+        if profiles is not None:
+            if stack and outerProfile is None:
+                # nested in a stage which is not profiled
+                statistics.overlapping += 1
+            elif stack or not self._exclusiveProfiler:
+                profile = self._getProfile(profiles, stage, ident)
+            elif self._profileLock.acquire(False):
+                acquired = True
+                profile = self._getProfile(profiles, stage, ident)
+            else:
+                statistics.overlapping += 1
+
+            if profile is not None and outerProfile is not None:
+                outerProfile.disable()
+
+        stack.append((stage, profile))
+        traceMemory = self._traceMemory and tracemalloc.is_tracing()
+        memory = tracemalloc.get_traced_memory()[0] if traceMemory else 0
+        start = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+
+        try:
+            return function(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+            duration = time.perf_counter() - start
+
+            statistics.calls += 1
+            statistics.total += duration
+            if duration > statistics.maximum:
+                statistics.maximum = duration
+            if traceMemory:
+                statistics.allocated += tracemalloc.get_traced_memory()[0] - memory
+
+            stack.pop()
+            if profile is not None and outerProfile is not None:
+                outerProfile.enable()
+            if acquired:
+                self._profileLock.release()
+
+    def _getProfile(self, profiles, stage, ident):
+        profile = profiles.get((stage, ident))
+        if profile is None:
+            profile = profiles[(stage, ident)] = cProfile.Profile()
+
+        return profile
+
+    def _sample(self):
+        callCode = StageProfiler._call.__code__
+
+        while not self._stopSampling.wait(self.sampleInterval):
+            frames = sys._current_frames()
+
+            for ident, stack in list(self._stacks.items()):
+                if not stack:
+                    continue
+
+                stage = stack[-1][0]
+                frame = frames.get(ident)
+
+                # frames below the wrapper of the innermost stage
+                names = list()
+                while frame is not None and frame.f_code is not callCode:
+                    code = frame.f_code
+                    names.append("%s (%s:%d)" %(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+                    frame = frame.f_back
+                if frame is None:
+                    # left the stage meanwhile
+                    continue
+
+                names.append(stage)
+                names.reverse()
+                self._samples[";".join(names)] += 1
+                self._statistics[stage].samples += 1
+
+    def _createRunDir(self):
+        name = "%s_%s" %(self._startWallTime.strftime("%Y%m%d-%H%M%S"), self._mode or "timing")
+        runDir = os.path.join(self.outputDir, name)
+
+        suffix = 1
+        while os.path.exists(runDir):
+            suffix += 1
+            runDir = os.path.join(self.outputDir, "%s_%d" %(name, suffix))
+
+        os.makedirs(runDir)
+
+        return runDir
+
+    def _saveStages(self, runDir, duration):
+        summary = dict()
+        summary["started"] = self._startWallTime.isoformat()
+        summary["duration"] = duration
+        summary["mode"] = self._mode
+        summary["tracemalloc"] = self._traceMemory
+        summary["stages"] = collections.OrderedDict(
+            (stage, self._statistics[stage].toDict()) for stage in self._stages)
+
+        with open(os.path.join(runDir, "stages.json"), "w") as outfile:
+            json.dump(summary, outfile, indent=4)
+
+        with open(os.path.join(runDir, "stages.txt"), "w") as outfile:
+            outfile.write(formatSummary(summary) + "\n")
+
+    def _saveProfiles(self, runDir):
+        for stage in self._stages:
+            # merge the profilers of all threads
+            stats = None
+            for (profileStage, ident), profile in self._profiles.items():
+                if profileStage != stage:
+                    continue
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+
+            if stats is None:
+                continue
+
+            stats.dump_stats(os.path.join(runDir, "%s.prof" %(stage)))
+
+            with open(os.path.join(runDir, "%s.txt" %(stage)), "w") as outfile:
+                stats.stream = outfile
+                stats.sort_stats("cumulative").print_stats(40)
+
+    def _saveSamples(self, runDir):
+        with open(os.path.join(runDir, "samples.folded"), "w") as outfile:
+            for stack, count in sorted(self._samples.items()):
+                outfile.write("%s %d\n" %(stack, count))
+
+    def _saveAllocations(self, runDir, endSnapshot):
+        endSnapshot.dump(os.path.join(runDir, "tracemalloc.snapshot"))
+
+        differences = endSnapshot.compare_to(self._startSnapshot, "lineno")
+
+        with open(os.path.join(runDir, "tracemalloc.txt"), "w") as outfile:
+            outfile.write("Top 40 lines by growth during the run\n")
+            for difference in differences[:40]:
+                outfile.write("%s\n" %(difference))
+
+# end of class StageProfiler
+
+
+##
+## @brief      Format the summary of a run as table
+##
+## @param      summary  The content of stages.json
+## @param      other    The content of stages.json of a run to compare with
+##
+## @return     The table as text
+##
+def formatSummary(summary, other=None):
+    lines = list()
+    lines.append("%s, %.1fs, %s%s"
+                 %(summary["started"],
+                   summary["duration"],
+                   summary["mode"] or "timing only",
+                   ", tracemalloc" if summary["tracemalloc"] else ""))
+    lines.append("%-16s %8s %10s %10s %12s %8s %8s"
+                 %("stage", "calls", "mean ms", "max ms", "alloc KiB", "overlap", "samples"))
+
+    for stage, stats in summary["stages"].items():
+        if not stats["calls"]:
+            lines.append("%-16s %8d" %(stage, 0))
+            continue
+
+        line = "%-16s %8d %10.3f %10.3f %12.1f %8d %8d" %(
+            stage,
+            stats["calls"],
+            stats["mean"] * 1e3,
+            stats["maximum"] * 1e3,
+            stats["allocated"] / 1024.0,
+            stats["overlapping"],
+            stats["samples"])
+
+        otherStats = other["stages"].get(stage) if other is not None else None
+        if otherStats and otherStats["calls"]:
+            line += "  mean %+.1f%%" %((stats["mean"] / otherStats["mean"] - 1) * 100)
+
+        lines.append(line)
+
+    return "\n".join(lines)
+
+
+def loadSummary(runDir):
+    with open(os.path.join(runDir, "stages.json"), "r") as infile:
+        return json.load(infile)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show or compare the stage summary of profiling runs")
+    parser.add_argument("run", help="Directory of a profiling run")
+    parser.add_argument("baseline", nargs="?", help="Directory of an earlier run to compare with")
+    args = parser.parse_args()
+
+    summary = loadSummary(args.run)
+    if args.baseline is None:
+        print(formatSummary(summary))
+        return
+
+    baseline = loadSummary(args.baseline)
+    print("baseline: " + formatSummary(baseline).splitlines()[0])
+    print(formatSummary(summary, baseline))
+
+if __name__ == '__main__':
+    main()
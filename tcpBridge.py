@@ -0,0 +1,591 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# ----------------------------------------------------------------------------
+#
+# ****************************************************************************
+# (c) Copyright by brainelectronics/ElectronicFuture, ALL RIGHTS RESERVED
+# ****************************************************************************
+#
+#  @author       brainelectronics (info@brainelectronics.de)
+#  @file         tcpBridge.py
+#  @date         October, 2026
+#  @version      0.1.0
+#  @brief        Share the serial stream with many local TCP/WebSocket clients
+#
+#   usage: python3 tcpBridge.py [--clients 1 4 16 64] [--messages 20000]
+#          runs a localhost benchmark of client count versus CPU time
+#
+#   used by serialDebugMonitor.py
+#
+#   A message is framed only once per server and the very same buffer is
+#   queued for every client. A client which does not read fast enough is
+#   handled by the drop policy of the server once its queue exceeds
+#   maxClientBytes:
+#       "oldest"     drop queued messages, starting with the oldest one
+#       "newest"     drop the new message for this client
+#       "disconnect" close the connection of this client
+# ----------------------------------------------------------------------------
+
+import argparse
+import base64
+import collections
+import errno
+import hashlib
+import logging
+import multiprocessing
+import selectors
+import socket
+import struct
+import threading
+import time
+
+# magic value of RFC 6455 to calculate the Sec-WebSocket-Accept header
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+DROP_POLICIES = ("oldest", "newest", "disconnect")
+
+# max number of queued buffers handed to a single sendmsg call
+MAX_SEND_BUFFERS = 64
+
+
+class FanoutClient(object):
+    __slots__ = ("sock", "address", "queue", "queuedBytes", "droppedMessages",
+                 "handshakeDone", "request", "writing", "closing", "inFlight")
+
+    def __init__(self, sock, address, handshakeDone):
+        self.sock = sock
+        self.address = address
+        self.queue = collections.deque()
+        self.queuedBytes = 0
+        self.droppedMessages = 0
+        self.handshakeDone = handshakeDone
+        self.request = b""
+        self.writing = False
+        self.closing = False
+        # number of buffers at the head handed to the socket right now
+        self.inFlight = 0
+
+# end of class FanoutClient
+
+
+class FanoutServer(object):
+    ##
+    ## @brief      Create a new fan-out server
+    ##
+    ## @param      self            The object
+    ## @param      host            The host to listen on
+    ## @param      port            The port to listen on, 0 for any free port
+    ## @param      websocket       Speak WebSocket instead of plain TCP
+    ## @param      binary          Send WebSocket binary instead of text frames
+    ## @param      maxClientBytes  Max queued bytes per client
+    ## @param      dropPolicy      "oldest", "newest" or "disconnect"
+    ##
+    def __init__(self,
+                 host="127.0.0.1",
+                 port=0,
+                 websocket=False,
+                 binary=True,
+                 maxClientBytes=1024*1024,
+                 dropPolicy="oldest"):
+        self.logger = logging.getLogger(__name__)
+
+        if dropPolicy not in DROP_POLICIES:
+            raise ValueError("Unknown drop policy: %s" %(dropPolicy))
+
+        self.host = host
+        self.port = port
+        self.websocket = websocket
+        self.binary = binary
+        self.maxClientBytes = maxClientBytes
+        self.dropPolicy = dropPolicy
+
+        self.sentBytes = 0
+        self.broadcastMessages = 0
+
+        self._clients = dict()
+        self._lock = threading.Lock()
+        self._selector = None
+        self._serverSocket = None
+        self._wakeReader = None
+        self._wakeWriter = None
+        self._serverThread = None
+        self._running = False
+
+    ##
+    ## @brief      Bind the server socket and start the server thread
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     The port the server is listening on
+    ##
+    def start(self):
+        self._serverSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._serverSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._serverSocket.bind((self.host, self.port))
+        self._serverSocket.listen(64)
+        self._serverSocket.setblocking(False)
+        self.port = self._serverSocket.getsockname()[1]
+
+        # used by broadcast() to wake up the selector of the server thread
+        self._wakeReader, self._wakeWriter = socket.socketpair()
+        self._wakeReader.setblocking(False)
+        self._wakeWriter.setblocking(False)
+
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._serverSocket, selectors.EVENT_READ)
+        self._selector.register(self._wakeReader, selectors.EVENT_READ)
+
+        self._running = True
+        self._serverThread = threading.Thread(
+            target=self._run,
+            name="FanoutServer-%d" %(self.port))
+        self._serverThread.daemon = True
+        self._serverThread.start()
+
+        self.logger.info("%s server listening on %s:%d"
+                         %("WebSocket" if self.websocket else "TCP", self.host, self.port))
+
+        return self.port
+
+    ##
+    ## @brief      Stop the server thread and close all connections
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     None
+    ##
+    def stop(self):
+        if not self._running:
+            return
+
+        self._running = False
+        self._wakeUp()
+        self._serverThread.join(1)
+
+        for client in list(self._clients.values()):
+            self._closeClient(client)
+        self._selector.close()
+        self._serverSocket.close()
+        self._wakeReader.close()
+        self._wakeWriter.close()
+
+    ##
+    ## @brief      Queue a message for all connected clients
+    ##
+    ## Safe to call from any thread, never blocks on slow clients.
+    ##
+    ## @param      self  The object
+    ## @param      data  The message as bytes
+    ##
+    ## @return     None
+    ##
+    def broadcast(self, data):
+        if not self._running or not self._clients:
+            return
+
+        buffer = memoryview(self.frame(data))
+        size = len(buffer)
+
+        with self._lock:
+            self.broadcastMessages += 1
+
+            for client in self._clients.values():
+                if not client.handshakeDone or client.closing:
+                    continue
+
+                if client.queuedBytes + size > self.maxClientBytes:
+                    if self.dropPolicy == "newest":
+                        client.droppedMessages += 1
+                        continue
+                    elif self.dropPolicy == "disconnect":
+                        # closed by the server thread
+                        client.closing = True
+                        client.droppedMessages += 1
+                        client.queue.clear()
+                        client.queuedBytes = 0
+                        continue
+                    else:
+                        self._dropOldest(client, size)
+
+                client.queue.append(buffer)
+                client.queuedBytes += size
+
+        self._wakeUp()
+
+    ##
+    ## @brief      Frame a message for this server's protocol
+    ##
+    ## @param      self  The object
+    ## @param      data  The payload as bytes
+    ##
+    ## @return     The bytes as sent to the clients
+    ##
+    def frame(self, data):
+        if not self.websocket:
+            return bytes(data)
+
+        opcode = 0x2 if self.binary else 0x1
+        length = len(data)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 65536:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+
+        return header + bytes(data)
+
+    ##
+    ## @brief      Gets the statistics of the server.
+    ##
+    ## @param      self  The object
+    ##
+    ## @return     Dict of client count, sent bytes and dropped messages
+    ##
+    def getStatistics(self):
+        with self._lock:
+            clients = list(self._clients.values())
+
+        stats = dict()
+        stats["clients"] = len(clients)
+        stats["activeClients"] = sum(1 for c in clients if c.handshakeDone)
+        stats["broadcastMessages"] = self.broadcastMessages
+        stats["sentBytes"] = self.sentBytes
+        stats["queuedBytes"] = sum(c.queuedBytes for c in clients)
+        stats["droppedMessages"] = sum(c.droppedMessages for c in clients)
+
+        return stats
+
+    def _dropOldest(self, client, size):
+        # buffers being sent and a partially sent head must be completed
+        # to keep the stream intact
+        first = max(client.inFlight, 1 if client.writing else 0)
+
+        while len(client.queue) > first and client.queuedBytes + size > self.maxClientBytes:
+            dropped = client.queue[first]
+            del client.queue[first]
+            client.queuedBytes -= len(dropped)
+            client.droppedMessages += 1
+
+    def _wakeUp(self):
+        try:
+            self._wakeWriter.send(b"\0")
+        except (BlockingIOError, OSError):
+            # wake up is already pending
+            pass
+
+    def _run(self):
+        while self._running:
+            for key, events in self._selector.select(timeout=1):
+                if key.fileobj is self._serverSocket:
+                    self._acceptClient()
+                elif key.fileobj is self._wakeReader:
+                    self._drainWakeUp()
+                else:
+                    client = key.data
+                    if events & selectors.EVENT_READ:
+                        self._readClient(client)
+                    if events & selectors.EVENT_WRITE and client.sock.fileno() >= 0:
+                        self._writeClient(client)
+
+            self._updateInterest()
+
+    def _drainWakeUp(self):
+        try:
+            while self._wakeReader.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def _acceptClient(self):
+        try:
+            sock, address = self._serverSocket.accept()
+        except (BlockingIOError, OSError):
+            return
+
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        client = FanoutClient(sock, address, handshakeDone=not self.websocket)
+        with self._lock:
+            self._clients[sock.fileno()] = client
+        self._selector.register(sock, selectors.EVENT_READ, client)
+
+        self.logger.debug("Client %s:%d connected" %address)
+
+    def _updateInterest(self):
+        with self._lock:
+            clients = list(self._clients.values())
+
+        for client in clients:
+            if client.closing:
+                # marked by the "disconnect" drop policy
+                self._closeClient(client)
+                continue
+
+            writing = bool(client.queue)
+            if writing != client.writing:
+                client.writing = writing
+                events = selectors.EVENT_READ
+                if writing:
+                    events |= selectors.EVENT_WRITE
+                self._selector.modify(client.sock, events, client)
+
+    def _readClient(self, client):
+        try:
+            data = client.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+
+        if not data:
+            self._closeClient(client)
+            return
+
+        if not client.handshakeDone:
+            client.request += data
+            if b"\r\n\r\n" in client.request:
+                self._acceptHandshake(client)
+            elif len(client.request) > 8192:
+                self._closeClient(client)
+        # anything else sent by clients (e.g. WebSocket pings) is ignored
+
+    def _acceptHandshake(self, client):
+        key = None
+        for line in client.request.split(b"\r\n"):
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"sec-websocket-key":
+                key = value.strip()
+
+        if key is None:
+            self._closeClient(client)
+            return
+
+        accept = base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID).digest())
+        response = (b"HTTP/1.1 101 Switching Protocols\r\n"
+                    b"Upgrade: websocket\r\n"
+                    b"Connection: Upgrade\r\n"
+                    b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+
+        with self._lock:
+            client.queue.append(memoryview(response))
+            client.queuedBytes += len(response)
+            client.handshakeDone = True
+            client.request = b""
+
+    def _writeClient(self, client):
+        with self._lock:
+            buffers = list()
+            for buffer in client.queue:
+                buffers.append(buffer)
+                if len(buffers) >= MAX_SEND_BUFFERS:
+                    break
+            # never dropped while the lock is released
+            client.inFlight = len(buffers)
+
+        if not buffers:
+            return
+
+        try:
+            if hasattr(client.sock, "sendmsg"):
+                # scatter/gather, no need to join the shared buffers
+                sent = client.sock.sendmsg(buffers)
+            else:
+                sent = client.sock.send(buffers[0])
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError as e:
+            with self._lock:
+                client.inFlight = 0
+            if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                self._closeClient(client)
+            return
+
+        self.sentBytes += sent
+
+        with self._lock:
+            client.inFlight = 0
+            if client.closing:
+                # queue already cleared by the "disconnect" drop policy
+                return
+
+            client.queuedBytes -= sent
+            while sent and client.queue:
+                head = client.queue[0]
+                if sent >= len(head):
+                    sent -= len(head)
+                    client.queue.popleft()
+                else:
+                    client.queue[0] = head[sent:]
+                    sent = 0
+
+    def _closeClient(self, client):
+        with self._lock:
+            self._clients.pop(client.sock.fileno(), None)
+
+        try:
+            self._selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+        self.logger.debug("Client %s:%d disconnected" %client.address)
+
+# end of class FanoutServer
+
+
+class SerialBridge(object):
+    ##
+    ## @brief      Rebroadcast the raw stream and JSON snapshots
+    ##
+    ## @param      self            The object
+    ## @param      host            The host to listen on
+    ## @param      rawPort         TCP port of the raw serial stream
+    ## @param      jsonPort        TCP port of the JSON snapshots, one per line
+    ## @param      websocketPort   WebSocket port of JSON snapshots, None to disable
+    ## @param      maxClientBytes  Max queued bytes per client
+    ## @param      dropPolicy      "oldest", "newest" or "disconnect"
+    ##
+    def __init__(self,
+                 host="127.0.0.1",
+                 rawPort=7000,
+                 jsonPort=7001,
+                 websocketPort=None,
+                 maxClientBytes=1024*1024,
+                 dropPolicy="oldest"):
+        self.rawServer = FanoutServer(host=host,
+                                      port=rawPort,
+                                      maxClientBytes=maxClientBytes,
+                                      dropPolicy=dropPolicy)
+        self.jsonServer = FanoutServer(host=host,
+                                       port=jsonPort,
+                                       maxClientBytes=maxClientBytes,
+                                       dropPolicy=dropPolicy)
+        self.websocketServer = None
+        if websocketPort is not None:
+            self.websocketServer = FanoutServer(host=host,
+                                                port=websocketPort,
+                                                websocket=True,
+                                                binary=False,
+                                                maxClientBytes=maxClientBytes,
+                                                dropPolicy=dropPolicy)
+
+    def getServers(self):
+        return [s for s in (self.rawServer, self.jsonServer, self.websocketServer) if s is not None]
+
+    def start(self):
+        for server in self.getServers():
+            server.start()
+
+    def stop(self):
+        for server in self.getServers():
+            server.stop()
+
+    ##
+    ## @brief      Broadcast data as received from the serial port
+    ##
+    ## @param      self  The object
+    ## @param      data  The received bytes
+    ##
+    ## @return     None
+    ##
+    def publishRaw(self, data):
+        self.rawServer.broadcast(data)
+
+    ##
+    ## @brief      Broadcast a JSON snapshot as received, without re-encoding
+    ##
+    ## @param      self  The object
+    ## @param      line  The JSON text of the snapshot
+    ##
+    ## @return     None
+    ##
+    def publishJson(self, line):
+        if isinstance(line, str):
+            line = line.encode("utf-8")
+        line = line.rstrip(b"\r\n")
+
+        self.jsonServer.broadcast(line + b"\n")
+        if self.websocketServer is not None:
+            self.websocketServer.broadcast(line)
+
+# end of class SerialBridge
+
+
+def _drainClients(port, clientCount, websocket, ready):
+    sockets = list()
+    selector = selectors.DefaultSelector()
+    for i in range(clientCount):
+        sock = socket.create_connection(("127.0.0.1", port))
+        if websocket:
+            sock.sendall(b"GET / HTTP/1.1\r\n"
+                         b"Host: 127.0.0.1\r\n"
+                         b"Upgrade: websocket\r\n"
+                         b"Connection: Upgrade\r\n"
+                         b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"
+                         b"Sec-WebSocket-Version: 13\r\n\r\n")
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ)
+        sockets.append(sock)
+    ready.set()
+
+    while sockets:
+        for key, events in selector.select(timeout=1):
+            try:
+                data = key.fileobj.recv(1024*1024)
+            except BlockingIOError:
+                continue
+            if not data:
+                selector.unregister(key.fileobj)
+                key.fileobj.close()
+                sockets.remove(key.fileobj)
+
+
+def main():
+    logFormat = "[%(asctime)s] [%(levelname)-8s] %(message)s"
+    logging.basicConfig(format=logFormat, level=logging.WARNING)
+
+    parser = argparse.ArgumentParser(description="Benchmark client count versus CPU time")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--messages", type=int, default=20*1000)
+    parser.add_argument("--size", type=int, default=200, help="Bytes per message")
+    parser.add_argument("--websocket", action="store_true")
+    args = parser.parse_args()
+
+    message = b"x" * (args.size - 1) + b"\n"
+
+    print("%8s %12s %12s %12s %10s" %("clients", "cpu [s]", "wall [s]", "MB sent", "dropped"))
+    for clientCount in args.clients:
+        server = FanoutServer(port=0, websocket=args.websocket, maxClientBytes=16*1024*1024)
+        port = server.start()
+
+        # clients are drained by another process so only the server is measured
+        ready = multiprocessing.Event()
+        drainer = multiprocessing.Process(target=_drainClients, args=(port, clientCount, args.websocket, ready))
+        drainer.start()
+        ready.wait()
+        while server.getStatistics()["activeClients"] < clientCount:
+            time.sleep(0.01)
+
+        cpuStart = time.process_time()
+        wallStart = time.time()
+        for i in range(args.messages):
+            server.broadcast(message)
+        while server.getStatistics()["queuedBytes"] > 0:
+            time.sleep(0.001)
+        cpu = time.process_time() - cpuStart
+        wall = time.time() - wallStart
+
+        stats = server.getStatistics()
+        server.stop()
+        drainer.join(5)
+
+        print("%8d %12.3f %12.3f %12.1f %10d" %(clientCount,
+                                                cpu,
+                                                wall,
+                                                stats["sentBytes"] / 1e6,
+                                                stats["droppedMessages"]))
+
+if __name__ == '__main__':
+    main()